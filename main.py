@@ -11,6 +11,7 @@ as a messages array with role/content structure.
 
 import asyncio
 import json
+import os
 import sys
 import logging
 from typing import Optional, List
@@ -26,6 +27,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Development aid: run with asyncio debug mode to catch blocking callers
+ASYNCIO_DEBUG = os.environ.get("ASYNCIO_DEBUG", "").lower() in ("1", "true", "yes")
+
 
 # =============================================================================
 # DUMMY TEST DATA - Pre-populated for POC testing
@@ -570,11 +574,28 @@ class POCRunner:
                     case_id=case_id
                 )
                 
-                result = await self.orchestrator.process_request(request)
+                # Stream the reply so text appears as the model generates it
+                print("\n" + "-" * 40)
+                print("BOT: ", end="", flush=True)
+                streamed = []
+                result = {}
+                async for event in self.orchestrator.stream_request(request):
+                    if event["type"] == "delta":
+                        print(event["content"], end="", flush=True)
+                        streamed.append(event["content"])
+                    else:
+                        result = event
                 case_id = result.get("case_id")
                 
-                print("\n" + "-" * 40)
-                print("BOT:", result.get("response", "No response"))
+                # Rule-based and fallback responses are not streamed, and a
+                # fallback can follow text the model had already streamed
+                response = result.get("response", "No response")
+                if not streamed:
+                    print(response)
+                elif "".join(streamed).strip() != response.strip():
+                    print("\n" + response)
+                else:
+                    print()
                 
                 if result.get("action"):
                     print(f"\n[Action: {result['action']}]")
@@ -593,10 +614,25 @@ class POCRunner:
 async def main():
     """Main entry point."""
     runner = POCRunner()
+    await runner.orchestrator.warm_up()
     
     # Always run all test scenarios automatically
-    await runner.run_all_scenarios()
+    try:
+        await runner.run_all_scenarios()
+    finally:
+        await runner.orchestrator.aclose()
+
+
+def install_event_loop() -> None:
+    """Use uvloop's faster libuv-based event loop when it is installed."""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("Using uvloop event loop")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    install_event_loop()
+    asyncio.run(main(), debug=ASYNCIO_DEBUG)
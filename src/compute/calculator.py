@@ -0,0 +1,279 @@
+"""
+Calculator
+
+Runs the short Python snippets the LLM sends through the run_calculation
+tool (days remaining, cost gaps, percentages, date arithmetic).
+
+- Snippets are compiled once and the code object reused on repeat calls
+- Only a small whitelist of builtins and modules is available; modules
+  are exposed as stand-ins holding their public, non-module attributes,
+  and private or dunder names are rejected before compiling
+- print() writes to a per-call buffer instead of swapping sys.stdout, so
+  calculations can run concurrently on worker threads
+- Results are reused for the same snippet on the same day, unless the
+  snippet may read the clock or a random source (see CLOCK_NAMES)
+- CalculationPool runs snippets in worker processes that are terminated
+  when a snippet overruns its timeout
+"""
+
+import io
+import ast
+import dis
+import asyncio
+import builtins
+import functools
+import logging
+import multiprocessing
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from types import CodeType, ModuleType, SimpleNamespace
+from typing import Any, Dict
+
+
+logger = logging.getLogger(__name__)
+
+# Modules a snippet may import
+ALLOWED_MODULES = frozenset({"datetime", "math", "decimal"})
+
+# Builtins a snippet may use (print is bound per call)
+SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in (
+        "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "float",
+        "int", "len", "list", "max", "min", "pow", "range", "round", "sorted",
+        "str", "sum", "tuple", "zip"
+    )
+}
+
+# Names provided to every snippet; excluded from the reported variables
+PRESET_NAMES = frozenset({"datetime", "date", "timedelta", "today", "now", "math", "Decimal"})
+
+# Attributes whose use makes a snippet's result depend on more than the
+# code and the date (date.today(), datetime.now(), time.time(), ...)
+CLOCK_NAMES = frozenset({
+    "now", "utcnow", "today", "time", "time_ns", "monotonic", "perf_counter",
+    "process_time", "localtime", "gmtime", "fromtimestamp", "random"
+})
+
+# Preset names that read the clock; the preset today is part of the cache key
+CLOCK_PRESETS = frozenset({"now"})
+
+
+# Attributes that read other attributes by name from a string
+# ("{0.__class__}".format(x)), which the AST check cannot see
+BLOCKED_ATTRIBUTES = frozenset({"format", "format_map"})
+
+
+# Syntax a snippet may use: arithmetic, comparisons, containers,
+# comprehensions, loops, small functions and whitelisted imports. No
+# classes, with/try, global/nonlocal, del, async or generators.
+ALLOWED_NODES = (
+    ast.Module, ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign,
+    ast.If, ast.For, ast.While, ast.Break, ast.Continue, ast.Pass,
+    ast.FunctionDef, ast.Lambda, ast.arguments, ast.arg, ast.Return,
+    ast.Import, ast.ImportFrom, ast.alias,
+    ast.Name, ast.Constant, ast.Attribute, ast.Subscript, ast.Slice, ast.Starred,
+    ast.Call, ast.keyword, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare,
+    ast.IfExp, ast.NamedExpr, ast.JoinedStr, ast.FormattedValue,
+    ast.List, ast.Tuple, ast.Dict, ast.Set,
+    ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp, ast.comprehension,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop, ast.expr_context,
+)
+
+
+class UnsafeCalculationError(ValueError):
+    """Raised for a snippet that uses a name or construct calculations may not."""
+
+
+def _module_view(module: ModuleType) -> SimpleNamespace:
+    # Public attributes only, and no modules: datetime re-exports sys
+    return SimpleNamespace(**{
+        name: value for name, value in vars(module).items()
+        if not name.startswith("_") and not isinstance(value, ModuleType)
+    })
+
+
+# What a snippet gets for each allowed module, instead of the module itself
+MODULE_VIEWS = {name: _module_view(__import__(name)) for name in ALLOWED_MODULES}
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name not in ALLOWED_MODULES:
+        raise ImportError(f"Import of '{name}' is not allowed in calculations")
+    return MODULE_VIEWS[name]
+
+
+def _check_snippet(tree: ast.AST) -> None:
+    """
+    Allow-list pass over the parsed snippet: only ALLOWED_NODES syntax, and
+    no private/dunder names or attributes (the usual sandbox escape routes).
+    """
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise UnsafeCalculationError(f"{type(node).__name__} is not allowed in calculations")
+        if isinstance(node, ast.Attribute):
+            name = node.attr
+        elif isinstance(node, ast.Name):
+            name = node.id
+        elif isinstance(node, ast.alias):
+            name = node.asname or node.name
+        else:
+            continue
+        if name.startswith("_") or name in BLOCKED_ATTRIBUTES:
+            raise UnsafeCalculationError(f"'{name}' is not allowed in calculations")
+
+
+@functools.lru_cache(maxsize=256)
+def compile_calculation(code: str) -> CodeType:
+    """
+    Check and compile a snippet, reusing the code object for identical source.
+
+    Raises:
+        SyntaxError: The snippet does not parse
+        UnsafeCalculationError: The snippet uses a disallowed name
+    """
+    tree = ast.parse(code, "<calculation>", "exec")
+    _check_snippet(tree)
+    return compile(tree, "<calculation>", "exec")
+
+
+@functools.lru_cache(maxsize=256)
+def _reads_clock(code: CodeType) -> bool:
+    """Whether the snippet (or any function it defines) reads a clock attribute or preset."""
+    for instruction in dis.get_instructions(code):
+        if instruction.opname in ("LOAD_ATTR", "LOAD_METHOD", "IMPORT_FROM"):
+            if instruction.argval in CLOCK_NAMES:
+                return True
+        elif instruction.opname in ("LOAD_NAME", "LOAD_GLOBAL"):
+            if instruction.argval in CLOCK_PRESETS:
+                return True
+    return any(isinstance(c, CodeType) and _reads_clock(c) for c in code.co_consts)
+
+
+def _execute(code: str, description: str, today: date) -> Dict[str, Any]:
+    output = io.StringIO()
+
+    def _print(*args, sep=" ", end="\n", **_):
+        output.write(sep.join(str(a) for a in args) + end)
+
+    namespace = {
+        "__builtins__": {**SAFE_BUILTINS, "print": _print, "__import__": _safe_import},
+        "datetime": datetime,
+        "date": date,
+        "timedelta": timedelta,
+        "today": today,
+        "now": datetime.now(),
+        "math": MODULE_VIEWS["math"],
+        "Decimal": Decimal
+    }
+
+    try:
+        exec(compile_calculation(code), namespace)
+    except Exception as e:
+        logger.error("CODE INTERPRETER error: %s", e)
+        return {
+            "status": "error",
+            "error_code": "CALCULATION_ERROR",
+            "message": str(e)
+        }
+
+    result = output.getvalue().strip()
+    logger.info("CODE INTERPRETER result: %s", result)
+
+    return {
+        "status": "ok",
+        "data": {
+            "description": description,
+            "output": result,
+            "variables": {k: str(v) for k, v in namespace.items()
+                          if not k.startswith("_") and k not in PRESET_NAMES
+                          and not isinstance(v, SimpleNamespace)}
+        }
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_calculation(code: str, description: str, today: date) -> Dict[str, Any]:
+    return _execute(code, description, today)
+
+
+def run_calculation(code: str, description: str = "Calculation") -> Dict[str, Any]:
+    """
+    Execute a calculation snippet.
+
+    Args:
+        code: Python source; results are reported via print()
+        description: What the calculation is for
+
+    Returns:
+        Dict with status and data (description, printed output, and any
+        variables the snippet assigned), or an error. Cached results are
+        shared between callers and must not be mutated.
+    """
+    today = date.today()
+    try:
+        cacheable = not _reads_clock(compile_calculation(code))
+    except (SyntaxError, UnsafeCalculationError):
+        cacheable = False  # reported by _execute
+    if cacheable:
+        return _cached_calculation(code, description, today)
+    return _execute(code, description, today)
+
+
+class CalculationPool:
+    """
+    Worker processes for run_calculation.
+
+    A thread cannot be stopped part way through a snippet, so a runaway
+    loop would hold a worker (and the GIL) for the life of the process.
+    When a snippet overruns its timeout the whole pool is terminated and
+    a fresh one is started for the next call; calculations that were
+    sharing it time out too.
+    """
+
+    def __init__(self, processes: int = 2):
+        self._processes = processes
+        self._pool = None
+
+    def start(self) -> None:
+        """Start the worker processes if they are not running."""
+        if self._pool is None:
+            # spawn: forking a process that already runs threads is unsafe
+            self._pool = multiprocessing.get_context("spawn").Pool(self._processes)
+
+    async def run(self, code: str, description: str, timeout: float) -> Dict[str, Any]:
+        """
+        Run a snippet in a worker process.
+
+        Raises:
+            TimeoutError: The snippet did not finish within timeout seconds;
+                its worker processes have been terminated.
+        """
+        self.start()
+        pool = self._pool
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(setter, value):
+            # Called on the pool's result thread
+            loop.call_soon_threadsafe(lambda: future.done() or setter(value))
+
+        pool.apply_async(
+            run_calculation, (code, description),
+            callback=lambda result: settle(future.set_result, result),
+            error_callback=lambda error: settle(future.set_exception, error)
+        )
+        try:
+            async with asyncio.timeout(timeout):
+                return await future
+        except TimeoutError:
+            if self._pool is pool:
+                self._pool = None
+                await asyncio.to_thread(pool.terminate)
+            raise
+
+    def close(self) -> None:
+        """Terminate the worker processes."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
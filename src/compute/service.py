@@ -321,14 +321,27 @@ class ComputeService:
         """
         Execute a computation based on tool_call parameters.
         
+        Args:
+            tool_call: Dictionary containing calculation parameters
+            
+        Returns:
+            JSON string with calculation results
+        """
+        return json.dumps(self.compute(tool_call), indent=2)
+    
+    def compute(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a computation and return the result dictionary.
+        
         This method routes to the appropriate calculation function based on
-        the parameters provided.
+        the parameters provided. In-process callers should use this rather
+        than run() to skip the JSON encode/decode round trip.
         
         Args:
             tool_call: Dictionary containing calculation parameters
             
         Returns:
-            JSON string with calculation results
+            Dictionary with calculation results
         """
         # Determine which calculation to perform based on parameters
         if "purchase_date" in tool_call and "coverage_type" in tool_call:
@@ -359,7 +372,7 @@ class ComputeService:
                 "message": "Could not determine calculation type from parameters"
             }
         
-        return json.dumps(result, indent=2)
+        return result
 
 
 # Factory function for service discovery
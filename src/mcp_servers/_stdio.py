@@ -0,0 +1,77 @@
+"""
+STDIO transport shared by the MCP servers.
+
+Reads newline-delimited JSON-RPC requests from stdin and writes one
+response line per request to stdout; diagnostics go to stderr so they do
+not break the protocol stream.
+"""
+
+import orjson
+import sys
+from typing import Callable
+
+
+# A server's handle_request: the response, or None for a notification
+Handler = Callable[[dict], dict | None]
+
+
+def serve_stdio(handle_request: Handler) -> None:
+    """Serve requests from stdin with handle_request until EOF."""
+    buffer = bytearray()
+    while True:
+        try:
+            # Read whatever is available (up to 64 KiB) and split it into
+            # newline-delimited requests, so one syscall can serve many
+            chunk = sys.stdin.buffer.read1(65536)
+        except Exception as e:
+            sys.stderr.write(f"Error: {e}\n")
+            sys.stderr.flush()
+            break
+        
+        if not chunk:
+            # EOF - process a trailing request without a newline, if any
+            if buffer.strip():
+                _process_line(buffer, handle_request)
+                sys.stdout.flush()
+            break
+        
+        # Extend in place and drop the complete lines from the front, so a
+        # long line arriving in many chunks is not recopied on every read
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        lines = buffer[:end].split(b"\n") if end >= 0 else []
+        del buffer[:end + 1]
+        
+        for line in lines:
+            _process_line(line, handle_request)
+        
+        # Flush once per chunk rather than once per response
+        if lines:
+            sys.stdout.flush()
+
+
+def _process_line(line: bytes, handle_request: Handler) -> None:
+    """Handle a single newline-delimited JSON-RPC request."""
+    try:
+        line = line.strip()
+        if not line:
+            return
+        
+        # Parse JSON-RPC request
+        try:
+            request = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            sys.stderr.write(f"JSON parse error: {e}\n")
+            sys.stderr.flush()
+            return
+        
+        # Handle request
+        response = handle_request(request)
+        
+        # Send response (skip for notifications)
+        if response is not None:
+            sys.stdout.buffer.write(orjson.dumps(response, option=orjson.OPT_APPEND_NEWLINE))
+    
+    except Exception as e:
+        sys.stderr.write(f"Error: {e}\n")
+        sys.stderr.flush()
@@ -12,12 +12,17 @@ This MCP server provides action execution capabilities for the warranty workflow
 For the POC, these are dummy implementations that simulate real actions.
 """
 
-import json
+import orjson
 import sys
 import uuid
 from datetime import datetime
 from typing import Any
 
+try:
+    from ._stdio import serve_stdio
+except ImportError:  # run as a script: python src/mcp_servers/<name>.py
+    from _stdio import serve_stdio
+
 
 # Dummy service providers database
 SERVICE_PROVIDERS = {
@@ -532,7 +537,7 @@ def handle_request(request: dict) -> dict:
                     "content": [
                         {
                             "type": "text",
-                            "text": json.dumps(result, indent=2)
+                            "text": orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
                         }
                     ]
                 }
@@ -566,33 +571,7 @@ def main():
     sys.stderr.write("Actions MCP Server starting...\n")
     sys.stderr.flush()
     
-    while True:
-        try:
-            line = sys.stdin.readline()
-            if not line:
-                break
-            
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                request = json.loads(line)
-            except json.JSONDecodeError as e:
-                sys.stderr.write(f"JSON parse error: {e}\n")
-                sys.stderr.flush()
-                continue
-            
-            response = handle_request(request)
-            
-            if response is not None:
-                response_str = json.dumps(response)
-                sys.stdout.write(response_str + "\n")
-                sys.stdout.flush()
-                
-        except Exception as e:
-            sys.stderr.write(f"Error: {e}\n")
-            sys.stderr.flush()
+    serve_stdio(handle_request)
 
 
 if __name__ == "__main__":
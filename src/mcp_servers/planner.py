@@ -19,12 +19,17 @@ The planner enforces workflow constraints:
 5. Decline path must log a reason
 """
 
-import json
+import orjson
 import sys
 from typing import Any
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+try:
+    from ._stdio import serve_stdio
+except ImportError:  # run as a script: python src/mcp_servers/<name>.py
+    from _stdio import serve_stdio
+
 
 class StepType(str, Enum):
     """Valid step types in a plan."""
@@ -42,6 +47,21 @@ class ActionType(str, Enum):
     ESCALATE = "ESCALATE"
 
 
+# Words that mark a reply to the HEAT "proceed?" question; declines win
+PROCEED_WORDS = ("yes", "proceed", "continue", "ok", "sure", "agree", "go ahead", "let's do it")
+DECLINE_WORDS = ("no", "cancel", "stop", "decline", "don't", "dont", "expensive", "can't afford")
+
+
+def parse_decision(user_message: str) -> str | None:
+    """Read a proceed/decline answer from the message: "DECLINE", "PROCEED" or None."""
+    user_lower = user_message.lower()
+    if any(word in user_lower for word in DECLINE_WORDS):
+        return "DECLINE"
+    if any(word in user_lower for word in PROCEED_WORDS):
+        return "PROCEED"
+    return None
+
+
 @dataclass
 class PlanStep:
     """A single step in the execution plan."""
@@ -256,13 +276,9 @@ def _generate_heat_plan(
     
     # HEAT Step 2: We have charges, now check user's response from this turn
     # The user_message in this turn should contain their yes/no answer
-    user_lower = user_message.lower()
+    decision = parse_decision(user_message)
     
-    # Detect user's decision from their message
-    is_yes = any(word in user_lower for word in ["yes", "proceed", "continue", "ok", "sure", "agree", "go ahead", "let's do it"])
-    is_no = any(word in user_lower for word in ["no", "cancel", "stop", "decline", "don't", "dont", "expensive", "can't afford"])
-    
-    if is_no or customer_decision == "DECLINE":
+    if decision == "DECLINE" or customer_decision == "DECLINE":
         # User is declining - log reason and end
         reason = user_message if len(user_message) > 5 else "Customer declined service"
         
@@ -287,7 +303,7 @@ def _generate_heat_plan(
         ))
         return _build_response(steps, "HEAT path - Turn 2: Customer declined, reason logged")
     
-    elif is_yes or customer_decision == "PROCEED":
+    elif decision == "PROCEED" or customer_decision == "PROCEED":
         # User wants to proceed - continue with territory check
         return _continue_heat_proceed_flow(steps, context, location, product_id, potential_charges)
     
@@ -442,7 +458,7 @@ def handle_request(request: dict) -> dict:
                     "content": [
                         {
                             "type": "text",
-                            "text": json.dumps(result, indent=2)
+                            "text": orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
                         }
                     ]
                 }
@@ -474,43 +490,11 @@ def handle_request(request: dict) -> dict:
 
 def main():
     """Main entry point for the MCP server using STDIO transport."""
-    import sys
-    
     # Log to stderr to avoid breaking JSON-RPC on stdout
     sys.stderr.write("Planner MCP Server starting...\n")
     sys.stderr.flush()
     
-    while True:
-        try:
-            # Read line from stdin
-            line = sys.stdin.readline()
-            if not line:
-                break
-            
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Parse JSON-RPC request
-            try:
-                request = json.loads(line)
-            except json.JSONDecodeError as e:
-                sys.stderr.write(f"JSON parse error: {e}\n")
-                sys.stderr.flush()
-                continue
-            
-            # Handle request
-            response = handle_request(request)
-            
-            # Send response (skip for notifications)
-            if response is not None:
-                response_str = json.dumps(response)
-                sys.stdout.write(response_str + "\n")
-                sys.stdout.flush()
-                
-        except Exception as e:
-            sys.stderr.write(f"Error: {e}\n")
-            sys.stderr.flush()
+    serve_stdio(handle_request)
 
 
 if __name__ == "__main__":
@@ -7,12 +7,17 @@ It exposes tools for fetching warranty records and resources for warranty terms.
 For the POC, this uses dummy data that simulates a real warranty database.
 """
 
-import json
+import orjson
 import sys
 from datetime import datetime, timedelta
 from typing import Any
 import uuid
 
+try:
+    from ._stdio import serve_stdio
+except ImportError:  # run as a script: python src/mcp_servers/<name>.py
+    from _stdio import serve_stdio
+
 
 # Dummy warranty database
 DUMMY_PRODUCTS = {
@@ -315,7 +320,7 @@ def handle_request(request: dict) -> dict:
                     "content": [
                         {
                             "type": "text",
-                            "text": json.dumps(result, indent=2)
+                            "text": orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
                         }
                     ]
                 }
@@ -330,7 +335,7 @@ def handle_request(request: dict) -> dict:
                     "content": [
                         {
                             "type": "text",
-                            "text": json.dumps(result, indent=2)
+                            "text": orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
                         }
                     ]
                 }
@@ -365,33 +370,7 @@ def main():
     sys.stderr.write("Warranty Docs MCP Server starting...\n")
     sys.stderr.flush()
     
-    while True:
-        try:
-            line = sys.stdin.readline()
-            if not line:
-                break
-            
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                request = json.loads(line)
-            except json.JSONDecodeError as e:
-                sys.stderr.write(f"JSON parse error: {e}\n")
-                sys.stderr.flush()
-                continue
-            
-            response = handle_request(request)
-            
-            if response is not None:
-                response_str = json.dumps(response)
-                sys.stdout.write(response_str + "\n")
-                sys.stdout.flush()
-                
-        except Exception as e:
-            sys.stderr.write(f"Error: {e}\n")
-            sys.stderr.flush()
+    serve_stdio(handle_request)
 
 
 if __name__ == "__main__":
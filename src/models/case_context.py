@@ -7,8 +7,67 @@ Pydantic models for managing case state throughout the warranty workflow.
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
-from pydantic import BaseModel, Field
-import uuid
+from pydantic import BaseModel, Field, PrivateAttr
+import secrets
+
+
+# Fields included in the tool-call view of a case (see CaseContext.to_dict).
+# product_name is one of the planner's required fields, so it is sent too;
+# without it the planner asks for the product name on every turn.
+_TOOL_CALL_FIELDS = frozenset({
+    "case_id",
+    "logged_in",
+    "has_registered_products",
+    "customer_id",
+    "product_id",
+    "product_name",
+    "serial_number",
+    "product_type",
+    "location",
+    "warranty_status",
+    "customer_decision",
+    "potential_charges",
+    "territory_checked",
+    "territory_serviceable",
+    "issue_description",
+})
+
+
+# Fields that shape the LLM's reply for a turn (identifiers excluded), used
+# to key cached responses (see CaseContext.state_json)
+_LLM_STATE_FIELDS = (_TOOL_CALL_FIELDS - {"case_id", "customer_id"}) | {"purchase_date"}
+
+# Assigning any of these invalidates the cached JSON views
+_JSON_VIEW_FIELDS = _TOOL_CALL_FIELDS | _LLM_STATE_FIELDS
+
+
+# Legend for CaseContext.to_llm_compact(), sent once in the system prompt.
+# Keys with unknown values are omitted from the compact form.
+LLM_COMPACT_LEGEND = """CASE STATE KEYS (omitted = unknown / not yet determined):
+id=case ID, pid=product ID, pt=product type (SALT|HEAT), pn=product name,
+pd=purchase date, loc=location {zip,city,state},
+wa=warranty active, wc=active coverage types, we=warranty expiry date,
+wl=coverage details by type, cd=customer decision (PENDING|PROCEED|DECLINE),
+ch=potential charges (USD), tc=territory checked, ts=territory serviceable"""
+
+
+# (date ordinal, "CASE-YYYYMMDD-") for the current day
+_CASE_ID_PREFIX_CACHE: List[Any] = [None, None]
+
+
+def _new_case_id() -> str:
+    """
+    Generate a case ID of the form CASE-YYYYMMDD-XXXXXXXX.
+    
+    The date prefix is formatted once per day. The 32-bit suffix comes
+    from the OS CSPRNG: a stored case is resumed by its ID alone, so IDs
+    must not be predictable from earlier ones.
+    """
+    today = datetime.now()
+    ordinal = today.toordinal()
+    if _CASE_ID_PREFIX_CACHE[0] != ordinal:
+        _CASE_ID_PREFIX_CACHE[:] = [ordinal, f"CASE-{today:%Y%m%d}-"]
+    return f"{_CASE_ID_PREFIX_CACHE[1]}{secrets.token_hex(4).upper()}"
 
 
 class ProductType(str, Enum):
@@ -24,7 +83,38 @@ class CustomerDecision(str, Enum):
     DECLINE = "DECLINE"
 
 
-class Location(BaseModel):
+# Precomputed enum value sets for the update() fast path
+_PRODUCT_TYPE_VALUES = frozenset(e.value for e in ProductType)
+_CUSTOMER_DECISION_VALUES = frozenset(e.value for e in CustomerDecision)
+_ENUM_FIELD_VALUES = {
+    "product_type": _PRODUCT_TYPE_VALUES,
+    "customer_decision": _CUSTOMER_DECISION_VALUES,
+}
+
+
+class _OwnedModel(BaseModel):
+    """
+    Nested case model that tells its owning CaseContext when it changes.
+    
+    Only attribute assignment is tracked; in-place mutation of a list or
+    dict field (e.g. coverage_types.append) is not, so reassign instead.
+    """
+    _owner: Optional[Any] = PrivateAttr(default=None)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        owner = self._owner
+        if owner is not None and not name.startswith("_"):
+            owner._json_cache.clear()
+    
+    def __eq__(self, other: Any) -> bool:
+        # Field values only: comparing _owner would recurse into the case
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+
+class Location(_OwnedModel):
     """Customer location model."""
     zip: Optional[str] = None
     city: Optional[str] = None
@@ -37,7 +127,7 @@ class Location(BaseModel):
         return bool(self.zip) or (bool(self.city) and bool(self.state))
 
 
-class WarrantyStatus(BaseModel):
+class WarrantyStatus(_OwnedModel):
     """Warranty status model."""
     active: bool = False
     coverage_types: List[str] = Field(default_factory=list)
@@ -53,7 +143,7 @@ class CaseContext(BaseModel):
     the orchestration workflow.
     """
     # Session/case identifiers
-    case_id: str = Field(default_factory=lambda: f"CASE-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}")
+    case_id: str = Field(default_factory=_new_case_id)
     session_id: Optional[str] = None
     
     # Authentication/registration state
@@ -93,12 +183,67 @@ class CaseContext(BaseModel):
     # Channel
     channel: str = "chat"
     
+    # Serialized views keyed by name; cleared when a view field changes
+    _json_cache: Dict[str, str] = PrivateAttr(default_factory=dict)
+    
     class Config:
         use_enum_values = True
     
+    def model_post_init(self, __context: Any) -> None:
+        self._adopt_children()
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in _JSON_VIEW_FIELDS:
+            self._json_cache.clear()
+            if name in ("location", "warranty_status"):
+                self._adopt_children()
+    
+    def __eq__(self, other: Any) -> bool:
+        # Field values only; the JSON cache is not part of the case state
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+    
+    def _adopt_children(self) -> bool:
+        """
+        Point nested models back at this case so their changes invalidate
+        the cache. Returns False if any child had to be (re)adopted, e.g.
+        after model_copy() shared it with another case.
+        """
+        adopted = True
+        for child in (self.location, self.warranty_status):
+            if isinstance(child, _OwnedModel) and child._owner is not self:
+                child._owner = self
+                adopted = False
+        return adopted
+    
+    def _dump_view(self, view: str, include: frozenset) -> str:
+        """Serialize a subset of fields, reusing the last result if unchanged."""
+        cache = self._json_cache
+        if not self._adopt_children():
+            cache.clear()
+        cached = cache.get(view)
+        if cached is None:
+            cached = cache[view] = self.model_dump_json(include=include)
+        return cached
+    
     def update(self, **kwargs) -> "CaseContext":
-        """Update context with new values and refresh updated_at."""
+        """
+        Update context with new values and refresh updated_at.
+        
+        Known enum values are stored as their plain string value (matching
+        use_enum_values) with a single frozenset lookup, bypassing the
+        generic model __setattr__ path.
+        """
         for key, value in kwargs.items():
+            allowed = _ENUM_FIELD_VALUES.get(key)
+            raw = getattr(value, "value", value)
+            if allowed is not None and isinstance(raw, str) and raw in allowed:
+                object.__setattr__(self, key, raw)
+                self.__pydantic_fields_set__.add(key)
+                self._json_cache.clear()
+                continue
             if hasattr(self, key):
                 setattr(self, key, value)
         self.updated_at = datetime.now()
@@ -132,6 +277,7 @@ class CaseContext(BaseModel):
             "has_registered_products": self.has_registered_products,
             "customer_id": self.customer_id,
             "product_id": self.product_id,
+            "product_name": self.product_name,
             "serial_number": self.serial_number,
             "product_type": self.product_type,
             "location": self.location.model_dump() if self.location else {},
@@ -143,6 +289,58 @@ class CaseContext(BaseModel):
             "issue_description": self.issue_description
         }
     
+    def to_llm_compact(self) -> Dict[str, Any]:
+        """
+        Short-key view of the case for LLM prompts (see LLM_COMPACT_LEGEND).
+        
+        Unknown values are omitted, which keeps the per-turn prompt small.
+        """
+        location = {}
+        if self.location:
+            location = {k: v for k, v in (("zip", self.location.zip), ("city", self.location.city), ("state", self.location.state)) if v}
+        warranty = self.warranty_status or WarrantyStatus()
+        compact = {
+            "id": self.case_id,
+            "pid": self.product_id or self.serial_number,
+            "pt": self.product_type,
+            "pn": self.product_name,
+            "pd": self.purchase_date,
+            "loc": location or None,
+            "wa": warranty.active if "active" in warranty.model_fields_set else None,
+            "wc": warranty.coverage_types or None,
+            "we": warranty.expiration_date,
+            "wl": warranty.all_coverage or None,
+            "cd": self.customer_decision,
+            "ch": self.potential_charges,
+            "tc": self.territory_checked,
+            "ts": self.territory_serviceable,
+        }
+        return {k: v for k, v in compact.items() if v is not None}
+    
+    def to_json(self) -> str:
+        """
+        Serialize the tool-call view of the case straight to JSON.
+        
+        Carries the same fields as to_dict(), encoded in a single pass by
+        pydantic's serializer as compact JSON: no whitespace, fields in
+        model order, enums and dates in pydantic's JSON form. It is not
+        byte-for-byte what json.dumps(self.to_dict()) gives. The output is
+        stable, so equal cases give equal strings and it can be compared
+        with an earlier to_json() or used in a key, but not compared with
+        other encodings of the dict. Prefer this wherever the consumer only
+        re-serializes the context.
+        """
+        return self._dump_view("tool_call", _TOOL_CALL_FIELDS)
+    
+    def state_json(self) -> str:
+        """
+        Serialize the case state the LLM sees, without case/customer IDs.
+        
+        Two cases in the same state produce the same string, which makes it
+        suitable as part of a response cache key.
+        """
+        return self._dump_view("llm_state", _LLM_STATE_FIELDS)
+    
     @classmethod
     def from_request(cls, request: Dict[str, Any]) -> "CaseContext":
         """
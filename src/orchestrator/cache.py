@@ -0,0 +1,168 @@
+"""
+Response Cache
+
+TTL key-value cache for LLM responses, so a repeated (case state, history,
+user message) turn is answered without another model call, plus a
+coalescer for identical in-flight tool calls.
+
+- InMemoryTTLCache: process-local, bounded by entry count
+- RedisTTLCache: shared across workers, used when REDIS_URL is set
+- RequestCoalescer: one underlying call for identical concurrent calls,
+  optionally keeping results for a short TTL
+"""
+
+import os
+import asyncio
+import time
+import hashlib
+import logging
+import orjson
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# How long a cached LLM response stays valid (0 disables the cache)
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600"))
+
+# How long a read-only tool result is reused across turns and cases (0 disables)
+TOOL_CACHE_TTL_SECONDS = int(os.environ.get("TOOL_CACHE_TTL_SECONDS", "300"))
+
+
+def response_cache_key(
+    system_prompt: str,
+    case_state: str,
+    history: List[Dict[str, Any]],
+    user_message: str,
+    current_date: str
+) -> str:
+    """
+    Build the cache key for one LLM turn.
+
+    Whitespace in the user message is normalized so stray spaces share an
+    entry. Case is kept: it can change the answer (a serial number, "US"
+    vs "us") and the cached reply echoes the customer's wording.
+    """
+    normalized_message = " ".join(user_message.split())
+    digest = hashlib.sha256()
+    for part in (
+        system_prompt.encode("utf-8"),
+        case_state.encode("utf-8"),
+        orjson.dumps(history, default=str, option=orjson.OPT_SORT_KEYS),
+        normalized_message.encode("utf-8"),
+        current_date.encode("utf-8")
+    ):
+        digest.update(part)
+        digest.update(b"\0")
+    return f"llm:{digest.hexdigest()}"
+
+
+class InMemoryTTLCache:
+    """Process-local TTL cache evicting the oldest entries past max_entries."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        """Store value for ttl_seconds."""
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisTTLCache:
+    """Redis-backed TTL cache."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "REDIS_URL is set but the redis package is not installed. "
+                "Install it with: pip install warranty-poc[redis]"
+            ) from e
+
+        self._redis = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if missing or expired."""
+        raw = await self._redis.get(key)
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    async def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        """Store value for ttl_seconds."""
+        await self._redis.set(key, value, ex=ttl_seconds)
+
+
+def create_response_cache():
+    """Create the response cache selected by the REDIS_URL environment variable."""
+    url = os.environ.get("REDIS_URL")
+    if url:
+        return RedisTTLCache(url)
+    return InMemoryTTLCache()
+
+
+class RequestCoalescer:
+    """
+    Collapse identical concurrent calls into one.
+
+    Callers using the same key while a call is in flight await the same
+    result instead of issuing their own request. With ttl_seconds > 0,
+    finished results accepted by keep() are also returned to later callers
+    until they expire. Only use for read-only, deterministic calls; callers
+    must not mutate the shared result.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 0,
+        max_entries: int = 1024,
+        keep: Callable[[Any], bool] = lambda result: True
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._keep = keep
+        self._inflight: Dict[Any, "asyncio.Future"] = {}
+        self._results: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    async def run(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return factory()'s result, sharing it with concurrent callers of key."""
+        entry = self._results.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                return entry[1]
+            del self._results[key]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        # Shield so one caller's cancellation does not cancel the others
+        return await asyncio.shield(future)
+
+    def _finished(self, key: Any, future: "asyncio.Future") -> None:
+        self._inflight.pop(key, None)
+        if self.ttl_seconds <= 0 or future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if not self._keep(result):
+            return
+        self._results[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
@@ -0,0 +1,112 @@
+"""
+Case Store
+
+Persistence for CaseContext between conversation turns.
+
+- InMemoryCaseStore: process-local LRU, used for local development and tests
+- RedisCaseStore: shared across workers with a TTL, used when REDIS_URL is set
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from src.models import CaseContext
+
+
+logger = logging.getLogger(__name__)
+
+# How long an idle case is kept in Redis (reset on every read and save)
+CASE_TTL_SECONDS = int(os.environ.get("CASE_TTL_SECONDS", "86400"))
+
+# Maximum number of cases kept by the in-memory store
+CASE_CACHE_SIZE = int(os.environ.get("CASE_CACHE_SIZE", "10000"))
+
+
+class InMemoryCaseStore:
+    """
+    Process-local case storage.
+
+    Bounded to max_size cases; the least recently used case is evicted
+    first so a long-running process does not grow without limit.
+    """
+
+    def __init__(self, max_size: int = CASE_CACHE_SIZE):
+        self.max_size = max_size
+        self._cases: "OrderedDict[str, CaseContext]" = OrderedDict()
+
+    async def get(self, case_id: str) -> Optional[CaseContext]:
+        """Return the stored case, or None if unknown or evicted."""
+        case = self._cases.get(case_id)
+        if case is not None:
+            self._cases.move_to_end(case_id)
+        return case
+
+    async def save(self, case: CaseContext) -> None:
+        """Store the case under its case_id."""
+        self._cases[case.case_id] = case
+        self._cases.move_to_end(case.case_id)
+        while len(self._cases) > self.max_size:
+            self._cases.popitem(last=False)
+
+    def __getitem__(self, case_id: str) -> CaseContext:
+        return self._cases[case_id]
+
+    def __contains__(self, case_id: str) -> bool:
+        return case_id in self._cases
+
+    def __len__(self) -> int:
+        return len(self._cases)
+
+
+class RedisCaseStore:
+    """
+    Redis-backed case storage.
+
+    Cases are stored as JSON under "case:<case_id>" and expire after
+    ttl_seconds without activity, so memory stays bounded and any worker
+    can resume a case. Reads refresh the TTL, so a conversation that is
+    still going is never dropped between turns.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl_seconds: int = CASE_TTL_SECONDS,
+        key_prefix: str = "case:"
+    ):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError(
+                "REDIS_URL is set but the redis package is not installed. "
+                "Install it with: pip install warranty-poc[redis]"
+            ) from e
+
+        self._redis = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+
+    def _key(self, case_id: str) -> str:
+        return f"{self.key_prefix}{case_id}"
+
+    async def get(self, case_id: str) -> Optional[CaseContext]:
+        """Return the stored case, or None if unknown or expired, and reset its TTL."""
+        raw = await self._redis.getex(self._key(case_id), ex=self.ttl_seconds)
+        if raw is None:
+            return None
+        return CaseContext.model_validate_json(raw)
+
+    async def save(self, case: CaseContext) -> None:
+        """Store the case and reset its TTL."""
+        await self._redis.set(self._key(case.case_id), case.model_dump_json(), ex=self.ttl_seconds)
+
+
+def create_case_store():
+    """Create the case store selected by the REDIS_URL environment variable."""
+    url = os.environ.get("REDIS_URL")
+    if url:
+        logger.info("Using Redis case store")
+        return RedisCaseStore(url)
+    return InMemoryCaseStore()
@@ -0,0 +1,68 @@
+"""
+Rate Limiting
+
+Client-side token budget for Azure OpenAI, so a burst of turns waits
+locally instead of exceeding the deployment's tokens-per-minute quota
+and coming back as 429s.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Tokens per minute this process may use (0 disables the budget)
+LLM_TPM_LIMIT = int(os.environ.get("LLM_TPM_LIMIT", "0"))
+
+# Length of the usage window in seconds
+WINDOW_SECONDS = 60.0
+
+
+class TokenBudget:
+    """
+    Sliding one-minute window of tokens used.
+
+    Calls wait() before a completion and record() with its total_tokens
+    afterwards. Token counts are only known once a call finishes, so the
+    budget can be overshot by the calls already in flight.
+    """
+
+    def __init__(self, tokens_per_minute: int = LLM_TPM_LIMIT):
+        self.tokens_per_minute = tokens_per_minute
+        self._usage: Deque[Tuple[float, int]] = deque()
+        self._used = 0
+
+    @property
+    def used(self) -> int:
+        """Tokens recorded in the current window."""
+        self._expire(time.monotonic())
+        return self._used
+
+    def _expire(self, now: float) -> None:
+        while self._usage and self._usage[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = self._usage.popleft()
+            self._used -= tokens
+
+    async def wait(self) -> None:
+        """Wait until the window has room for another call."""
+        if self.tokens_per_minute <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._expire(now)
+            if self._used < self.tokens_per_minute:
+                return
+            delay = self._usage[0][0] + WINDOW_SECONDS - now
+            logger.info("Token budget exhausted - used=%s, waiting %.1fs", self._used, delay)
+            await asyncio.sleep(delay)
+
+    def record(self, tokens: int) -> None:
+        """Record tokens used by a finished call."""
+        if tokens and self.tokens_per_minute > 0:
+            self._usage.append((time.monotonic(), tokens))
+            self._used += tokens
@@ -14,18 +14,39 @@ This orchestrator:
 
 import os
 import sys
-import json
+import time
+import uuid
 import asyncio
+import hashlib
+import itertools
 import logging
+import reprlib
 import tomllib
-from typing import Any, Dict, List, Optional, Tuple
+import orjson
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from openai import AzureOpenAI
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from openai import APIConnectionError, AsyncAzureOpenAI, InternalServerError, RateLimitError
+from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, stop_any, wait_random_exponential
+from azure.identity import DefaultAzureCredential, ManagedIdentityCredential, get_bearer_token_provider
 
 from src.models import CaseContext, WarrantyStatus, Location
+from src.models.case_context import LLM_COMPACT_LEGEND
+from src.compute import calculator
 from src.compute.service import ComputeService
+from src.mcp_servers import planner, warranty_docs, actions
+from src.orchestrator.case_store import create_case_store
+from src.orchestrator.rate_limit import TokenBudget
+from src.orchestrator.cache import (
+    LLM_CACHE_TTL_SECONDS,
+    TOOL_CACHE_TTL_SECONDS,
+    RequestCoalescer,
+    create_response_cache,
+    response_cache_key
+)
 
 
 # Configure logging
@@ -36,21 +57,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The SDKs log every HTTP request at INFO; keep only their warnings
+for _noisy in ("openai", "httpx", "azure"):
+    logging.getLogger(_noisy).setLevel(logging.WARNING)
+
+
+CONFIG_PATH = "config/agent.toml"
+SYSTEM_PROMPT_PATH = "config/system_prompt.txt"
+
+
+def _mtime(path: str) -> Optional[int]:
+    """Return the file's modification time, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
 
 def load_config() -> dict:
-    """Load configuration from config/agent.toml."""
-    config_path = "config/agent.toml"
+    """Load configuration from config/agent.toml (re-read only when the file changes)."""
+    return _read_config(CONFIG_PATH, _mtime(CONFIG_PATH))
+
+
+@functools.lru_cache(maxsize=1)
+def _read_config(config_path: str, mtime: Optional[int]) -> dict:
     try:
         with open(config_path, "rb") as f:
             return tomllib.load(f)
     except FileNotFoundError:
-        logger.warning(f"Config file not found at {config_path}")
+        logger.warning("Config file not found at %s", config_path)
         return {}
     except Exception as e:
-        logger.warning(f"Error loading config: {e}")
+        logger.warning("Error loading config: %s", e)
         return {}
 
 
+def _load_system_prompt() -> str:
+    """Load the system prompt from file (re-read only when the file changes)."""
+    return _read_system_prompt(SYSTEM_PROMPT_PATH, _mtime(SYSTEM_PROMPT_PATH))
+
+
+@functools.lru_cache(maxsize=1)
+def _read_system_prompt(prompt_path: str, mtime: Optional[int]) -> str:
+    try:
+        with open(prompt_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        logger.warning("System prompt not found at %s", prompt_path)
+        return "You are a warranty service assistant."
+
+
+AZURE_OPENAI_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_token_provider():
+    """
+    Return the process-wide Azure AD token provider for Azure OpenAI.
+    
+    DefaultAzureCredential probes several auth sources on first use, so one
+    credential (and its token cache) is shared by every orchestrator. When
+    running under a managed identity the probe is skipped entirely.
+    """
+    if os.environ.get("IDENTITY_ENDPOINT") or os.environ.get("MSI_ENDPOINT"):
+        credential = ManagedIdentityCredential(client_id=os.environ.get("AZURE_CLIENT_ID"))
+    else:
+        credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
+    return get_bearer_token_provider(credential, AZURE_OPENAI_SCOPE)
+
+
 # Workflow step types
 STEP_TYPES = {
     "ASK_USER_FOR_INFO",
@@ -68,11 +143,841 @@ ACTION_TYPES = {
 }
 
 
+# Case fields each tool falls back to when its args omit them. Tools that
+# snapshot the whole case (case.to_dict()) read every field.
+ALL_CASE_FIELDS = frozenset(CaseContext.model_fields)
+
+TOOL_CASE_READS = {
+    "get_plan": ALL_CASE_FIELDS,
+    "get_warranty_record": frozenset({"product_id"}),
+    "get_warranty_terms": frozenset(),
+    "calculate_charges": frozenset({"product_id", "product_type", "warranty_status", "location"}),
+    "route_to_queue": ALL_CASE_FIELDS,
+    "get_service_directory": frozenset({"location"}),
+    "check_territory": frozenset({"location"}),
+    # The territory fields encode the "territory check before PayPal" invariant
+    "generate_paypal_link": frozenset({"potential_charges", "case_id", "territory_checked", "territory_serviceable"}),
+    "log_decline_reason": ALL_CASE_FIELDS,
+    "notify_next_steps": frozenset({"channel"}),
+    "run_calculation": frozenset(),
+    "fetch_tool_result": frozenset(),
+}
+
+# Case fields written by _update_case_from_tool_result for each tool
+TOOL_CASE_WRITES = {
+    "get_warranty_record": frozenset({"product_type", "product_name", "purchase_date", "warranty_status"}),
+    "calculate_charges": frozenset({"potential_charges"}),
+    "check_territory": frozenset({"territory_checked", "territory_serviceable"}),
+    "route_to_queue": frozenset({"case_id"}),
+}
+
+# Tools with effects outside the case (queues, payments, logs, notifications);
+# a turn that ran any of these must not be replayed from cache
+SIDE_EFFECT_TOOLS = frozenset({
+    "route_to_queue",
+    "generate_paypal_link",
+    "log_decline_reason",
+    "notify_next_steps",
+})
+
+
+# Tools that finish the workflow; once one has run, the model is asked for
+# its final reply without further tool calls
+TERMINAL_TOOLS = frozenset({
+    "generate_paypal_link",
+    "log_decline_reason",
+    "notify_next_steps",
+})
+
+# Upper bound on LLM iterations per turn; lowered to the rule plan's
+# length plus two when a plan is available
+MAX_LLM_ITERATIONS = 10
+
+
+# Read-only tools that may be run ahead of time and whose result is reused
+# if the next turn (or the rule-based fallback) calls them with the same args
+SPECULATIVE_TOOLS = frozenset({"check_territory", "get_warranty_record", "get_service_directory"})
+
+# Transient Azure OpenAI failures retried with backoff: 429s, dropped
+# connections / timeouts, and 5xx responses such as 503
+RETRYABLE_LLM_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+# Longest Retry-After (seconds) honoured before retrying an LLM call
+MAX_RETRY_AFTER_SECONDS = 60.0
+
+
+def _wait_retry_after(fallback: Callable[[Any], float]) -> Callable[[Any], float]:
+    """
+    Tenacity wait that honours the Retry-After header of 429/503 responses.
+    
+    Falls back to (and never waits less than) the given backoff.
+    """
+    def wait(retry_state) -> float:
+        backoff = fallback(retry_state)
+        response = getattr(retry_state.outcome.exception(), "response", None)
+        header = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(backoff, min(float(header), MAX_RETRY_AFTER_SECONDS))
+        except (TypeError, ValueError):
+            return backoff
+    return wait
+
+
+def _stop_past_deadline(retry_state) -> bool:
+    """Tenacity stop: give up when the next wait would run past the turn deadline."""
+    deadline = retry_state.kwargs.get("deadline")
+    if deadline is None:
+        return False
+    return asyncio.get_running_loop().time() + retry_state.upcoming_sleep >= deadline
+
+
+# Output token cap per completion; replies are short and streamed, so this
+# only bounds a runaway generation
+LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", "2000"))
+
+# Longest a single completion attempt (opening and reading the stream) may take
+LLM_CALL_TIMEOUT_SECONDS = float(os.environ.get("LLM_CALL_TIMEOUT_SECONDS", "30"))
+
+# Wall-clock budget for one agentic loop; past it the turn falls back to
+# the rule-based workflow
+LLM_TURN_BUDGET_SECONDS = float(os.environ.get("LLM_TURN_BUDGET_SECONDS", "60"))
+
+# Reply when the loop stops after a side-effecting tool ran but before the
+# model answered; rerunning the rule-based workflow would repeat those tools
+STILL_WORKING_RESPONSE = "I'm still working on your request and will follow up shortly."
+
+# LLM loop failures log a full traceback once per this many errors
+LLM_ERROR_TRACEBACK_EVERY = 100
+
+# Longest a run_calculation snippet may take before the tool reports a timeout
+CALCULATION_TIMEOUT_SECONDS = 5.0
+
+# Plans made only of these steps are answered without calling the LLM
+DETERMINISTIC_STEP_TYPES = frozenset({"ASK_USER_FOR_INFO", "RETURN_ACTION"})
+
+# Tool results larger than this (serialized bytes) are stored and sent to
+# the LLM as a summary plus a reference it can pass to fetch_tool_result
+TOOL_RESULT_INLINE_BYTES = int(os.environ.get("TOOL_RESULT_INLINE_BYTES", "2048"))
+
+# How long a stored tool result can be fetched
+TOOL_RESULT_TTL_SECONDS = 900
+
+# Approximate prompt budget for one agentic loop; older tool results are
+# replaced with a stub once the messages exceed it (see _trim_tool_results)
+LLM_HISTORY_TOKEN_BUDGET = int(os.environ.get("LLM_HISTORY_TOKEN_BUDGET", "12000"))
+
+# Most recent tool-calling turns that are never trimmed
+KEEP_RECENT_TOOL_TURNS = 3
+
+TRIMMED_TOOL_RESULT = orjson.dumps({
+    "status": "trimmed",
+    "message": "Earlier result omitted to save space; call the tool again if it is needed."
+}).decode()
+
+# Upper bound on outstanding speculative results (oldest are dropped)
+MAX_SPECULATIVE_RESULTS = 256
+
+# Batch job statuses after which no more output will be produced
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Bounded repr for log previews: only the elements that can be shown are
+# formatted, so a large plan or record is never serialized just to be cut
+_PREVIEW = reprlib.Repr()
+_PREVIEW.maxlevel = 3
+_PREVIEW.maxdict = 8
+_PREVIEW.maxlist = 8
+_PREVIEW.maxstring = 80
+_PREVIEW.maxother = 40
+
+
+def _short_repr(obj: Any, limit: int) -> str:
+    """Preview of obj for logging, at most limit characters."""
+    text = _PREVIEW.repr(obj)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _dump_tool_json(value: Any) -> str:
+    """Encode tool results, or anything holding them, as JSON text; keys need not be strings."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _canonical_args(tool_args: Dict[str, Any]) -> bytes:
+    """Encode tool args with sorted keys so equal args compare equal."""
+    return orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS, default=str)
+
+
+def _speculation_key(case_id: str, tool_name: str, tool_args: Dict[str, Any]) -> Tuple[str, str, bytes]:
+    """Key a speculative result by case, tool and canonical args."""
+    return case_id, tool_name, _canonical_args(tool_args)
+
+
+# Bit flags for tools whose order the workflow constrains; _validate_plan
+# folds them into one int per plan so each constraint is a single mask test
+_WARRANTY_LOOKUP = 1
+_CHARGES = 2
+_TERRITORY = 4
+_PAYPAL = 8
+_DECLINE = 16
+
+_TOOL_BITS = {
+    "get_warranty_record": _WARRANTY_LOOKUP,
+    "calculate_charges": _CHARGES,
+    "check_territory": _TERRITORY,
+    "generate_paypal_link": _PAYPAL,
+    "log_decline_reason": _DECLINE,
+}
+
+# Product-branch tools, which need the product type from the warranty record
+_BRANCH_TOOLS = _CHARGES | _TERRITORY | _PAYPAL | _DECLINE
+
+
+def _batch_plan_steps(steps: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Group plan steps into batches that can be executed together.
+    
+    Consecutive CALL_TOOL steps share a batch as long as none of them reads
+    a case field written by an earlier tool in the same batch, and a batch
+    holds at most one side-effecting tool, so those run in plan order (a
+    notification never goes out before the queue routing it follows).
+    Every other step type is a batch of its own.
+    """
+    batches: List[List[Dict[str, Any]]] = []
+    written: set = set()
+    has_side_effect = False
+    
+    for step in steps:
+        is_tool = step.get("step_type") == "CALL_TOOL"
+        tool_name = step.get("tool_name")
+        side_effect = tool_name in SIDE_EFFECT_TOOLS
+        
+        if is_tool and batches and batches[-1][0].get("step_type") == "CALL_TOOL":
+            if (
+                TOOL_CASE_READS.get(tool_name, ALL_CASE_FIELDS).isdisjoint(written)
+                and not (side_effect and has_side_effect)
+            ):
+                batches[-1].append(step)
+                written |= TOOL_CASE_WRITES.get(tool_name, frozenset())
+                has_side_effect |= side_effect
+                continue
+        
+        batches.append([step])
+        written = set(TOOL_CASE_WRITES.get(tool_name, frozenset())) if is_tool else set()
+        has_side_effect = is_tool and side_effect
+    
+    return batches
+
+
+# ----------------------------------------------------------------------
+# Case updaters: apply a successful tool result's data to the case.
+# Keep in sync with TOOL_CASE_WRITES.
+# ----------------------------------------------------------------------
+
+def _apply_warranty_record(case: CaseContext, data: Dict[str, Any]) -> None:
+    # Update product and warranty info
+    case.product_type = data.get("product_type")
+    case.product_name = data.get("product_name")
+    case.purchase_date = data.get("purchase_date")
+    
+    warranty_data = data.get("warranty_status", {})
+    case.warranty_status = WarrantyStatus(
+        active=warranty_data.get("active", False),
+        coverage_types=warranty_data.get("coverage_types", []),
+        all_coverage=warranty_data.get("all_coverage", {})
+    )
+
+
+def _apply_charges(case: CaseContext, data: Dict[str, Any]) -> None:
+    summary = data.get("summary", {})
+    case.potential_charges = summary.get("total_potential_charges")
+
+
+def _apply_territory(case: CaseContext, data: Dict[str, Any]) -> None:
+    case.territory_checked = True
+    case.territory_serviceable = data.get("serviceable", False)
+
+
+def _apply_queue_routing(case: CaseContext, data: Dict[str, Any]) -> None:
+    # Case ID from queue might override
+    if data.get("case_id"):
+        case.case_id = data["case_id"]
+
+
+_CASE_UPDATERS: Dict[str, Callable[[CaseContext, Dict[str, Any]], None]] = {
+    "get_warranty_record": _apply_warranty_record,
+    "calculate_charges": _apply_charges,
+    "check_territory": _apply_territory,
+    "route_to_queue": _apply_queue_routing,
+}
+
+
+# ------------------------------------------------------------------
+# Per-tool log details and summaries: each takes the result's data
+# ------------------------------------------------------------------
+
+def _plan_log(data: Dict[str, Any]) -> List[str]:
+    plan_steps = data.get('plan', [])
+    lines = [
+        "    │ PLANNER RESULT:",
+        f"    │   Routing: {data.get('routing', 'N/A')}",
+        f"    │   Steps: {len(plan_steps)}",
+    ]
+    for i, step in enumerate(plan_steps):
+        step_type = step.get('step_type', 'UNKNOWN')
+        if hasattr(step_type, 'value'):
+            step_type = step_type.value
+        lines.append(f"    │     {i+1}. {step_type}: {step.get('description', '')[:60]}")
+    return lines
+
+
+def _warranty_record_log(data: Dict[str, Any]) -> List[str]:
+    ws = data.get('warranty_status', {})
+    return [
+        "    │ WARRANTY RECORD RESULT:",
+        f"    │   Product: {data.get('product_name', 'N/A')}",
+        f"    │   Type: {data.get('product_type', 'N/A')}",
+        f"    │   Warranty Active: {ws.get('active', 'N/A')}",
+        f"    │   Coverage: {ws.get('coverage_types', [])}",
+        f"    │   Expiry: {ws.get('expiration_date', 'N/A')}",
+    ]
+
+
+def _calculation_log(data: Dict[str, Any]) -> List[str]:
+    return [
+        "    │ CALCULATION RESULT:",
+        f"    │   Description: {data.get('description', 'N/A')}",
+        f"    │   Output: {data.get('output', 'N/A')}",
+    ]
+
+
+def _service_directory_log(data: Dict[str, Any]) -> List[str]:
+    providers = data.get('providers', [])
+    return [
+        "    │ SERVICE DIRECTORY RESULT:",
+        f"    │   Providers found: {len(providers)}",
+        *(f"    │     - {p.get('name', 'N/A')} ({p.get('distance_miles', 'N/A')} mi)" for p in providers[:3]),
+    ]
+
+
+def _territory_log(data: Dict[str, Any]) -> List[str]:
+    return [
+        "    │ TERRITORY CHECK RESULT:",
+        f"    │   Serviceable: {data.get('serviceable', 'N/A')}",
+        f"    │   Region: {data.get('region', 'N/A')}",
+    ]
+
+
+def _paypal_log(data: Dict[str, Any]) -> List[str]:
+    return [
+        "    │ PAYPAL LINK RESULT:",
+        f"    │   Payment URL: {data.get('payment_url', 'N/A')[:50]}...",
+    ]
+
+
+def _queue_routing_log(data: Dict[str, Any]) -> List[str]:
+    return [
+        "    │ QUEUE ROUTING RESULT:",
+        f"    │   Queue: {data.get('queue', 'N/A')}",
+        f"    │   Case ID: {data.get('case_id', 'N/A')}",
+    ]
+
+
+def _default_log(data: Dict[str, Any]) -> List[str]:
+    return [f"    │ Result Data: {_short_repr(data, 300)}"]
+
+
+_TOOL_LOGGERS: Dict[str, Callable[[Dict[str, Any]], List[str]]] = {
+    "get_plan": _plan_log,
+    "get_warranty_record": _warranty_record_log,
+    "run_calculation": _calculation_log,
+    "get_service_directory": _service_directory_log,
+    "check_territory": _territory_log,
+    "generate_paypal_link": _paypal_log,
+    "route_to_queue": _queue_routing_log,
+}
+
+
+def _charges_summary(data: Dict[str, Any]) -> str:
+    summary = data.get("summary", {})
+    return f"Total charges: ${summary.get('total_potential_charges', 0)}"
+
+
+_TOOL_SUMMARIZERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "get_plan": lambda data: f"Plan with {len(data.get('plan', []))} steps, routing={data.get('routing', 'N/A')}",
+    "get_warranty_record": lambda data: (
+        f"Warranty active={data.get('warranty_status', {}).get('active', 'N/A')}, "
+        f"coverage={data.get('warranty_status', {}).get('coverage_types', [])}"
+    ),
+    "run_calculation": lambda data: f"Calculated: {data.get('output', 'N/A')}",
+    "get_service_directory": lambda data: f"Found {len(data.get('providers', []))} service providers",
+    "check_territory": lambda data: f"Serviceable: {data.get('serviceable', 'N/A')}",
+    "generate_paypal_link": lambda data: "Payment link generated",
+    "route_to_queue": lambda data: f"Routed to queue: {data.get('queue', 'N/A')}",
+    "calculate_charges": _charges_summary,
+}
+
+
+# Called with each content fragment as it streams in from the model
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+
+async def _collect_stream(
+    stream: AsyncIterator[Any],
+    on_delta: Optional[DeltaCallback] = None,
+    on_tool_call: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_usage: Optional[Callable[[int], None]] = None
+) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+    """
+    Assemble a streamed chat completion.
+    
+    Content fragments are forwarded to on_delta as they arrive. Tool call
+    fragments are accumulated by index into plain dicts in the shape the
+    chat completions API expects for assistant messages. Tool calls stream
+    one after another, so each is passed to on_tool_call as soon as the
+    next one starts (or the stream ends). If the stream reports usage,
+    total_tokens is passed to on_usage.
+    
+    Returns:
+        Tuple of (content, tool_calls, finish_reason)
+    """
+    content_parts: List[str] = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    finish_reason = None
+    
+    async for chunk in stream:
+        usage = getattr(chunk, "usage", None)
+        if usage and on_usage:
+            on_usage(usage.total_tokens)
+        
+        # Azure sends content-filter and usage chunks with no choices
+        if not chunk.choices:
+            continue
+        
+        choice = chunk.choices[0]
+        delta = choice.delta
+        
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_delta:
+                await on_delta(delta.content)
+        
+        for fragment in delta.tool_calls or []:
+            if on_tool_call and fragment.index not in tool_calls and tool_calls:
+                on_tool_call(tool_calls[max(tool_calls)])
+            call = tool_calls.setdefault(fragment.index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if fragment.id:
+                call["id"] = fragment.id
+            if fragment.function:
+                if fragment.function.name:
+                    call["function"]["name"] += fragment.function.name
+                if fragment.function.arguments:
+                    call["function"]["arguments"] += fragment.function.arguments
+        
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+    
+    if on_tool_call and tool_calls:
+        on_tool_call(tool_calls[max(tool_calls)])
+    
+    return "".join(content_parts), [tool_calls[i] for i in sorted(tool_calls)], finish_reason
+
+
+def _parse_request(request: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Return the latest user message and the internal request for an OpenAI-style request."""
+    # Extract messages and context from OpenAI-style request
+    messages = request.get("messages", [])
+    context = request.get("context", {})
+
+    # Get the latest user message
+    user_message = ""
+    for msg in reversed(messages):
+        if msg.get("role") == "user":
+            user_message = msg.get("content", "")
+            break
+
+    # Build internal request from context
+    internal_request = {
+        "user_message": user_message,
+        "logged_in": context.get("logged_in", False),
+        "has_registered_products": context.get("has_registered_products", False),
+        "product_id": context.get("product_id"),
+        "product_type": context.get("product_type"),
+        "product_name": context.get("product_name"),
+        "serial_number": context.get("serial_number"),
+        "purchase_date": context.get("purchase_date"),
+        "warranty_status": context.get("warranty_status"),
+        "location": context.get("location"),
+        "customer_id": context.get("customer_id"),
+        "customer_name": context.get("customer_name"),
+        "case_id": context.get("case_id"),
+        "channel": context.get("channel", "chat")
+    }
+
+    return user_message, internal_request
+
+
+def _batch_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one Batch API output line into a result dict."""
+    case_id = entry["custom_id"]
+    response = entry.get("response") or {}
+    body = response.get("body") or {}
+    if entry.get("error") or response.get("status_code") != 200:
+        error = entry.get("error") or body.get("error") or {}
+        return {
+            "case_id": case_id,
+            "status": "error",
+            "response": "",
+            "tool_calls": [],
+            "error": error.get("message", "Batch request failed") if isinstance(error, dict) else str(error)
+        }
+    message = body["choices"][0]["message"]
+    return {
+        "case_id": case_id,
+        "status": "ok",
+        "message": {"role": "assistant", "content": message.get("content") or ""},
+        "response": message.get("content") or "",
+        "tool_calls": message.get("tool_calls") or []
+    }
+
+
+class _CaseDefaults:
+    """
+    Case-derived defaults for tool arguments.
+    
+    The case is dumped at most once, and only if a tool actually needs a
+    default, so steps run together share one dump instead of each walking
+    the model again.
+    """
+    
+    __slots__ = ("_case", "_context")
+    
+    def __init__(self, case: CaseContext):
+        self._case = case
+        self._context: Optional[Dict[str, Any]] = None
+    
+    def context(self) -> Dict[str, Any]:
+        if self._context is None:
+            self._context = self._case.to_dict()
+        return self._context
+    
+    def location(self) -> Dict[str, Any]:
+        return self.context()["location"]
+    
+    def warranty_status(self) -> Dict[str, Any]:
+        return self.context()["warranty_status"]
+
+
+def _arg(tool_args: Dict[str, Any], name: str, default: Callable[[], Any]) -> Any:
+    """Return tool_args[name], calling default() only if the arg is missing."""
+    return tool_args[name] if name in tool_args else default()
+
+
+async def _tool_error_boundary(call: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Await a tool call, turning an unexpected exception into an error result."""
+    try:
+        return await call
+    except Exception as e:
+        logger.error("Tool call raised - error=%s", e)
+        return {
+            "status": "error",
+            "error_code": "TOOL_ERROR",
+            "message": str(e)
+        }
+
+
+async def _run_after(previous: Optional[asyncio.Task], call: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Await a tool call once the previous task (if any) has finished, whatever its outcome."""
+    if previous is not None:
+        await asyncio.wait([previous])
+    return await call
+
+
+def _is_deterministic_plan(plan: Optional[Dict[str, Any]]) -> bool:
+    """
+    True if the plan only asks the customer for something or hands off.
+    
+    Such a plan's reply is fully scripted by the planner, so the LLM adds
+    nothing but latency. Only used for context-only turns: product and
+    location details reach the case through the request context, so free
+    text ("what does the deductible cover?") always goes to the model
+    rather than getting the same canned question back.
+    """
+    if not plan or "error" in plan:
+        return False
+    steps = plan.get("plan") or []
+    return bool(steps) and all(
+        getattr(step.get("step_type"), "value", step.get("step_type")) in DETERMINISTIC_STEP_TYPES
+        for step in steps
+    )
+
+
+def _iteration_limit(plan: Optional[Dict[str, Any]]) -> int:
+    """LLM iterations allowed for a turn following this plan: its steps plus two."""
+    steps = (plan or {}).get("plan") or []
+    return min(MAX_LLM_ITERATIONS, len(steps) + 2) if steps else MAX_LLM_ITERATIONS
+
+
+# Result fields that only echo the request back; the LLM already has them
+HISTORY_ECHO_FIELDS = {
+    "get_service_directory": frozenset({"product_type", "location"}),
+}
+
+
+def _without_case_context(step: Dict[str, Any]) -> Dict[str, Any]:
+    args = step.get("tool_args")
+    if not args or "case_context" not in args:
+        return step
+    return {**step, "tool_args": {k: v for k, v in args.items() if k != "case_context"}}
+
+
+def _truncate_for_history(tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drop parts of a tool result the LLM does not need, since the tool
+    message is re-sent on every later iteration.
+    
+    Plan steps lose their copies of the case (route_to_queue fills
+    case_context from the case) and echoed request fields are removed.
+    Returns the result itself when nothing is dropped.
+    """
+    data = result.get("data")
+    if not isinstance(data, dict):
+        return result
+    compact = data
+    if tool_name == "get_plan" and data.get("plan"):
+        compact = {**data, "plan": [_without_case_context(step) for step in data["plan"]]}
+    echo = HISTORY_ECHO_FIELDS.get(tool_name)
+    if echo:
+        compact = {k: v for k, v in compact.items() if k not in echo}
+    return result if compact is data else {**result, "data": compact}
+
+
+# Send lists of same-shaped records in tool results as columns + rows
+# (field names once instead of per record); off until validated
+COMPACT_TOOL_RESULTS = os.environ.get("COMPACT_TOOL_RESULTS") == "1"
+
+# Appended to the system prompt when COMPACT_TOOL_RESULTS is on
+COLUMNAR_LEGEND = """
+
+TOOL RESULT LISTS: {"cols": [...], "rows": [[...], ...]} is a list of records;
+each row holds one record's values in column order."""
+
+
+def _columnar(value: Any) -> Any:
+    """Rewrite lists of dicts that share the same keys as {"cols", "rows"}, recursively."""
+    if isinstance(value, list):
+        if len(value) > 1 and all(isinstance(v, dict) for v in value):
+            cols = list(value[0])
+            if all(list(v) == cols for v in value[1:]):
+                return {"cols": cols, "rows": [[_columnar(v[c]) for c in cols] for v in value]}
+        return [_columnar(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _columnar(v) for k, v in value.items()}
+    return value
+
+
+def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough token count for messages (about four characters per token)."""
+    chars = 0
+    for message in messages:
+        chars += len(message.get("content") or "")
+        for call in message.get("tool_calls") or ():
+            chars += len(call["function"]["arguments"])
+    return chars // 4
+
+
+def _trim_tool_results(
+    messages: List[Dict[str, Any]],
+    token_budget: int = LLM_HISTORY_TOKEN_BUDGET,
+    keep_recent: int = KEEP_RECENT_TOOL_TURNS
+) -> int:
+    """
+    Replace the oldest tool results with a stub until messages fit the budget.
+    
+    Results from the keep_recent most recent tool-calling turns are kept.
+    Assistant tool calls and their tool messages stay in place, so the
+    conversation remains valid for the chat completions API.
+    
+    Returns:
+        Number of tool results trimmed
+    """
+    tokens = _estimate_tokens(messages)
+    if tokens <= token_budget:
+        return 0
+    
+    turn_starts = [i for i, m in enumerate(messages) if m.get("tool_calls")]
+    trimmed = 0
+    for start in turn_starts[:max(len(turn_starts) - keep_recent, 0)]:
+        for message in messages[start + 1:]:
+            if message.get("role") != "tool":
+                break
+            if len(message["content"]) <= len(TRIMMED_TOOL_RESULT):
+                continue
+            tokens -= (len(message["content"]) - len(TRIMMED_TOOL_RESULT)) // 4
+            message["content"] = TRIMMED_TOOL_RESULT
+            trimmed += 1
+        if tokens <= token_budget:
+            break
+    return trimmed
+
+
+def _parse_tool_args(arguments: str) -> Dict[str, Any]:
+    """Parse a tool call's JSON arguments, treating malformed input as no args."""
+    # Argument-less tools stream an empty string; skip the decode error path
+    if not arguments or arguments == "{}":
+        return {}
+    try:
+        args = orjson.loads(arguments)
+    except orjson.JSONDecodeError:
+        return {}
+    return args if isinstance(args, dict) else {}
+
+
+# Development only: re-read config/tools/*.json on every LLM call
+RELOAD_TOOLS = os.environ.get("WARRANTY_RELOAD_TOOLS") == "1"
+
+
+@functools.lru_cache(maxsize=1)
+def _load_tool_definitions() -> List[Dict[str, Any]]:
+    """
+    Load tool definitions from config/tools/*.json files.
+    
+    Built once per process; callers must not mutate the returned list.
+    """
+    import glob
+    
+    tools = []
+    tools_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "config", "tools")
+    
+    # Load all JSON files from config/tools/
+    # Sorted so every process sends the tools in the same order (stable prompt prefix)
+    json_files = sorted(glob.glob(os.path.join(tools_dir, "*.json")))
+    
+    for json_file in json_files:
+        try:
+            with open(json_file, 'rb') as f:
+                tool_def = orjson.loads(f.read())
+                tools.append(tool_def)
+                logger.debug("Loaded tool definition: %s from %s", tool_def.get('function', {}).get('name', 'unknown'), json_file)
+        except Exception as e:
+            logger.warning("Failed to load tool definition from %s: %s", json_file, e)
+    
+    # Add the run_calculation tool (code interpreter - not from MCP)
+    tools.append({
+        "type": "function",
+        "function": {
+            "name": "run_calculation",
+            "description": "Run Python for any math (days remaining, cost differences, date arithmetic, percentages). Never do math yourself.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "code": {
+                        "type": "string",
+                        "description": "Python that print()s the result; date, datetime, timedelta, today, math available"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "What is being calculated"
+                    }
+                },
+                "required": ["code", "description"]
+            }
+        }
+    })
+    
+    # Retrieves large tool results that were sent by reference
+    tools.append({
+        "type": "function",
+        "function": {
+            "name": "fetch_tool_result",
+            "description": "Fetch the full data behind a summarized tool result. Only if the summary lacks what you need.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ref": {
+                        "type": "string",
+                        "description": "The summary's 'ref'"
+                    }
+                },
+                "required": ["ref"]
+            }
+        }
+    })
+    
+    logger.info("Loaded %s tool definitions from %s", len(tools), tools_dir)
+    return tools
+
+
+@functools.lru_cache(maxsize=8)
+def _tool_definitions_without(excluded: frozenset) -> List[Dict[str, Any]]:
+    """Tool definitions minus the excluded tools, shared per exclusion set."""
+    return [t for t in _load_tool_definitions() if t["function"]["name"] not in excluded]
+
+
+@functools.lru_cache(maxsize=16)
+def _prompt_cache_key(system_message: str, tool_names: Tuple[str, ...]) -> str:
+    """
+    Key for the system prompt + tool schema prefix shared by LLM calls.
+    
+    Sent as prompt_cache_key so requests with the same prefix are routed to
+    the same prompt cache instead of re-processing it every turn.
+    """
+    digest = hashlib.blake2b(system_message.encode(), digest_size=16)
+    digest.update(orjson.dumps(tool_names))
+    return digest.hexdigest()
+
+
+def _has_warranty_record(case: CaseContext) -> bool:
+    ws = case.warranty_status
+    return case.product_type is not None and ws is not None and "active" in ws.model_fields_set
+
+
+# Tools not offered to the LLM once the case already holds their answer,
+# saving their schema tokens on every later completion
+ANSWERED_TOOL_CHECKS: Tuple[Tuple[str, Callable[[CaseContext], bool]], ...] = (
+    ("get_warranty_record", _has_warranty_record),
+    ("check_territory", lambda case: bool(case.territory_checked)),
+    ("calculate_charges", lambda case: case.potential_charges is not None),
+)
+
+
+# Appended to the system prompt for the LLM agentic loop
+LLM_RESPONSE_GUIDELINES = """
+
+IMPORTANT RESPONSE GUIDELINES:
+- When you call a tool, wait for the result before responding
+- After getting tool results, provide a CONCISE response to the user
+- Do NOT explain your reasoning process or workflow steps to the user
+- Do NOT output code blocks or function call syntax in your response
+- Speak directly to the customer in a friendly, professional tone
+- If you need more information from the user, ask clearly and wait for their response
+
+CRITICAL - USE CODE INTERPRETER FOR ALL MATH:
+- NEVER do math calculations yourself - always use the run_calculation tool
+- Use run_calculation for: warranty days remaining, cost differences, coverage gaps, percentages, date arithmetic
+- Example: To find warranty days remaining, use run_calculation with Python code
+- Example: To find how much customer must pay if warranty covers $X but cost is $Y, use run_calculation
+- Always show the customer the calculation results clearly
+
+"""
+
+
 class PlanValidationError(Exception):
     """Raised when a plan violates workflow constraints."""
     pass
 
 
+class LLMStreamInterrupted(Exception):
+    """
+    Raised when a completion stream fails part way through.
+    
+    Not retried, since content may already have been forwarded to the caller.
+    """
+    pass
+
+
 class WarrantyOrchestrator:
     """
     Main orchestration agent for warranty workflow.
@@ -103,20 +1008,77 @@ class WarrantyOrchestrator:
         self.endpoint = endpoint or azure_config.get("endpoint") or os.environ.get("AZURE_OPENAI_ENDPOINT", "")
         self.deployment = deployment or azure_config.get("deployment") or os.environ.get("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
         self.api_version = azure_config.get("api_version", api_version)
+        self.batch_deployment = (
+            azure_config.get("batch_deployment")
+            or os.environ.get("AZURE_OPENAI_BATCH_DEPLOYMENT")
+            or self.deployment
+        )
         
         # Initialize compute service (local tool)
         self.compute_service = ComputeService()
         
+        # Worker threads for synchronous tool functions, so concurrent tool
+        # calls overlap instead of blocking the event loop one after another
+        self._tool_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("TOOL_EXECUTOR_WORKERS", "8")),
+            thread_name_prefix="warranty-tool"
+        )
+        
+        # run_calculation snippets run in their own processes, which can be
+        # killed on timeout without tying up the tool threads above
+        self._calculations = calculator.CalculationPool(int(os.environ.get("CALCULATION_WORKERS", "2")))
+        
+        # Tool name -> bound handler, resolved once instead of per call
+        self._tool_handlers = {
+            "get_plan": self._tool_get_plan,
+            "get_warranty_record": self._tool_get_warranty_record,
+            "get_warranty_terms": self._tool_get_warranty_terms,
+            "calculate_charges": self._tool_calculate_charges,
+            "route_to_queue": self._tool_route_to_queue,
+            "get_service_directory": self._tool_get_service_directory,
+            "check_territory": self._tool_check_territory,
+            "generate_paypal_link": self._tool_generate_paypal_link,
+            "log_decline_reason": self._tool_log_decline_reason,
+            "notify_next_steps": self._tool_notify_next_steps,
+            "run_calculation": self._tool_run_calculation,
+            "fetch_tool_result": self._tool_fetch_tool_result,
+        }
+        
+        # Shares one in-flight call among concurrent identical read-only calls,
+        # and reuses successful results for TOOL_CACHE_TTL_SECONDS
+        self._coalescer = RequestCoalescer(
+            ttl_seconds=TOOL_CACHE_TTL_SECONDS,
+            keep=lambda result: result.get("status") == "ok"
+        )
+        
+        # Speculative tool results: (case_id, tool_name, canonical args) ->
+        # (expires_at, task), in start order; unclaimed entries expire after
+        # TOOL_CACHE_TTL_SECONDS like any other cached lookup
+        self._speculative: "OrderedDict[Tuple[str, str, bytes], Tuple[float, asyncio.Task]]" = OrderedDict()
+        
+        # Cap in-flight LLM calls so bursts queue here instead of turning
+        # into 429s from Azure OpenAI
+        self._llm_semaphore = asyncio.Semaphore(int(os.environ.get("LLM_CONCURRENCY", "8")))
+        self._token_budget = TokenBudget()
+        self._llm_error_count = itertools.count()
+        
         # Initialize Azure OpenAI client
         self._init_client()
         
-        # Case context storage (in production, use Redis/database)
-        self._cases: Dict[str, CaseContext] = {}
+        # Case context storage (Redis when REDIS_URL is set, else in-process)
+        self._cases = create_case_store()
+        
+        # Cache of final LLM responses keyed on the turn's inputs
+        self._response_cache = create_response_cache()
         
         # Load system prompt
-        self.system_prompt = self._load_system_prompt()
+        self.system_prompt = _load_system_prompt()
+        # Static for the life of the orchestrator, so built once
+        self._system_message = self.system_prompt + LLM_RESPONSE_GUIDELINES + LLM_COMPACT_LEGEND
+        if COMPACT_TOOL_RESULTS:
+            self._system_message += COLUMNAR_LEGEND
         
-        logger.info(f"Warranty Orchestrator initialized - endpoint={self.endpoint}, deployment={self.deployment}")
+        logger.info("Warranty Orchestrator initialized - endpoint=%s, deployment=%s", self.endpoint, self.deployment)
     
     def _init_client(self):
         """Initialize the Azure OpenAI client."""
@@ -126,34 +1088,68 @@ class WarrantyOrchestrator:
             return
         
         try:
-            # Use DefaultAzureCredential for managed identity
-            credential = DefaultAzureCredential()
-            token_provider = get_bearer_token_provider(
-                credential,
-                "https://cognitiveservices.azure.com/.default"
-            )
-            
-            self.client = AzureOpenAI(
+            self.client = AsyncAzureOpenAI(
                 azure_endpoint=self.endpoint,
-                azure_ad_token_provider=token_provider,
-                api_version=self.api_version
+                azure_ad_token_provider=_get_token_provider(),
+                api_version=self.api_version,
+                http_client=self._build_http_client()
             )
             logger.info("Azure OpenAI client initialized with managed identity")
         except Exception as e:
-            logger.warning(f"Failed to initialize Azure OpenAI client: {e}")
+            logger.warning("Failed to initialize Azure OpenAI client: %s", e)
             self.client = None
     
-    def _load_system_prompt(self) -> str:
-        """Load the system prompt from file."""
-        prompt_path = "config/system_prompt.txt"
+    def _build_http_client(self):
+        """
+        Build the pooled HTTP/2 client used for Azure OpenAI calls.
+        
+        Long-lived keepalive connections and HTTP/2 multiplexing let
+        concurrent requests share one TLS connection instead of each
+        paying for a new handshake.
+        """
+        import httpx
+        
+        return httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=50,
+                keepalive_expiry=300.0
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+    
+    async def warm_up(self) -> None:
+        """
+        Load the tool definitions, start the calculation processes and
+        fetch the first Azure AD token ahead of the first request.
+        
+        All run in worker threads; the tool loader's cache and the
+        credential's token cache then serve later calls, so the first
+        customer turn does not block the event loop on file reads, process
+        start-up or the credential probe.
+        """
+        if self.client is None:
+            return
+        await asyncio.to_thread(_load_tool_definitions)
+        await asyncio.to_thread(self._calculations.start)
         try:
-            with open(prompt_path, "r", encoding="utf-8") as f:
-                return f.read().strip()
-        except FileNotFoundError:
-            logger.warning(f"System prompt not found at {prompt_path}")
-            return "You are a warranty service assistant."
+            await asyncio.to_thread(_get_token_provider())
+            logger.info("Azure AD token cache warmed")
+        except Exception as e:
+            logger.warning("Token warm-up failed - error=%s", e)
     
-    def get_or_create_case(self, request: Dict[str, Any]) -> CaseContext:
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and stop the tool worker threads and processes."""
+        for _, task in self._speculative.values():
+            task.cancel()
+        self._speculative.clear()
+        if self.client is not None:
+            await self.client.close()
+        self._tool_executor.shutdown(wait=False, cancel_futures=True)
+        self._calculations.close()
+    
+    async def get_or_create_case(self, request: Dict[str, Any]) -> CaseContext:
         """
         Get existing case or create new one from request.
         
@@ -165,8 +1161,8 @@ class WarrantyOrchestrator:
         """
         case_id = request.get("case_id")
         
-        if case_id and case_id in self._cases:
-            case = self._cases[case_id]
+        case = await self._cases.get(case_id) if case_id else None
+        if case is not None:
             # Update with any new information from request
             if request.get("user_message"):
                 case.add_user_message(request["user_message"])
@@ -177,12 +1173,16 @@ class WarrantyOrchestrator:
         if request.get("user_message"):
             case.add_user_message(request["user_message"])
         
-        self._cases[case.case_id] = case
-        logger.info(f"Created new case - case_id={case.case_id}")
+        await self._cases.save(case)
+        logger.info("Created new case - case_id=%s", case.case_id)
         
         return case
     
-    async def process_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_request(
+        self,
+        request: Dict[str, Any],
+        on_delta: Optional[DeltaCallback] = None
+    ) -> Dict[str, Any]:
         """
         Process an incoming warranty request.
         
@@ -202,6 +1202,7 @@ class WarrantyOrchestrator:
                     - location: Optional location object
                     - case_id: Optional case ID for continuing a case
                     - customer_id, customer_name, etc.
+            on_delta: Optional async callback receiving response text as it streams
                 
         Returns:
             Response dict following OpenAI-style format:
@@ -213,49 +1214,23 @@ class WarrantyOrchestrator:
                 - tool_calls: List of tool call summaries for debugging
         """
         try:
-            # Extract messages and context from OpenAI-style request
             messages = request.get("messages", [])
-            context = request.get("context", {})
-            
-            # Get the latest user message
-            user_message = ""
-            for msg in reversed(messages):
-                if msg.get("role") == "user":
-                    user_message = msg.get("content", "")
-                    break
-            
-            # Build internal request from context
-            internal_request = {
-                "user_message": user_message,
-                "logged_in": context.get("logged_in", False),
-                "has_registered_products": context.get("has_registered_products", False),
-                "product_id": context.get("product_id"),
-                "product_type": context.get("product_type"),
-                "product_name": context.get("product_name"),
-                "serial_number": context.get("serial_number"),
-                "purchase_date": context.get("purchase_date"),
-                "warranty_status": context.get("warranty_status"),
-                "location": context.get("location"),
-                "customer_id": context.get("customer_id"),
-                "customer_name": context.get("customer_name"),
-                "case_id": context.get("case_id"),
-                "channel": context.get("channel", "chat")
-            }
+            user_message, internal_request = _parse_request(request)
             
             # Get or create case context
-            case = self.get_or_create_case(internal_request)
+            case = await self.get_or_create_case(internal_request)
             
             logger.info("=" * 70)
-            logger.info(f"PROCESS REQUEST - case_id={case.case_id}")
-            logger.info(f"User Message: {user_message[:200]}...")
-            logger.info(f"Messages in history: {len(messages)}")
+            logger.info("PROCESS REQUEST - case_id=%s", case.case_id)
+            logger.info("User Message: %s...", user_message[:200])
+            logger.info("Messages in history: %s", len(messages))
             logger.info("=" * 70)
             
             # Use LLM for reasoning (falls back to rule-based if client unavailable)
-            result = await self.process_with_llm(case, user_message, messages)
+            result = await self.process_with_llm(case, user_message, messages, on_delta=on_delta)
             
             # Save case state
-            self._cases[case.case_id] = case
+            await self._cases.save(case)
             
             # Return in OpenAI-style format
             return {
@@ -272,7 +1247,7 @@ class WarrantyOrchestrator:
             }
             
         except Exception as e:
-            logger.error(f"Request processing failed - error={str(e)}", exc_info=True)
+            logger.error("Request processing failed - error=%s", e, exc_info=True)
             return {
                 "case_id": request.get("context", {}).get("case_id", "unknown"),
                 "status": "error",
@@ -280,10 +1255,126 @@ class WarrantyOrchestrator:
                 "error": str(e)
             }
     
+    async def stream_request(self, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a request, yielding response text as it is generated.
+        
+        Yields {"type": "delta", "content": "..."} events while the model
+        streams, followed by one {"type": "final", ...} event carrying the
+        same fields process_request returns. Suitable for Server-Sent Events.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def on_delta(text: str) -> None:
+            await queue.put({"type": "delta", "content": text})
+        
+        async def run() -> None:
+            try:
+                result = await self.process_request(request, on_delta=on_delta)
+                await queue.put({"type": "final", **result})
+            finally:
+                await queue.put(None)
+        
+        task = asyncio.create_task(run())
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    async def batch_process(
+        self,
+        requests: List[Dict[str, Any]],
+        poll_interval: float = 30.0
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Process many requests through the Azure OpenAI Batch API.
+        
+        For offline workloads (regression corpora, bulk reprocessing, evals)
+        where latency does not matter; batch jobs are billed at a lower rate
+        than real-time calls. Each request gets a single completion with the
+        tool definitions attached - tool calls the model asks for are returned
+        in tool_calls, not executed. Interactive turns should keep using
+        process_request.
+        
+        Args:
+            requests: OpenAI-style requests, as accepted by process_request
+            poll_interval: Seconds between batch status checks
+            
+        Returns:
+            Results keyed by case_id, each with status, response and tool_calls
+        """
+        if not self.client:
+            raise RuntimeError("Batch processing requires an Azure OpenAI client")
+        
+        from datetime import date
+        current_date = date.today().isoformat()
+        
+        case_ids = []
+        lines = []
+        for request in requests:
+            user_message, internal_request = _parse_request(request)
+            case = await self.get_or_create_case(internal_request)
+            case_ids.append(case.case_id)
+            tools = self._get_tool_definitions(case)
+            lines.append(orjson.dumps({
+                "custom_id": case.case_id,
+                "method": "POST",
+                "url": "/chat/completions",
+                "body": {
+                    "model": self.batch_deployment,
+                    "messages": self._build_messages(case, user_message, request.get("messages", []), current_date),
+                    "tools": tools,
+                    "tool_choice": "auto",
+                    "max_tokens": LLM_MAX_TOKENS,
+                    "prompt_cache_key": self._prompt_cache_key(tools)
+                }
+            }, default=str))
+        
+        input_file = await self.client.files.create(
+            file=("warranty_batch.jsonl", b"\n".join(lines), "application/jsonl"),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/chat/completions",
+            completion_window="24h"
+        )
+        logger.info("Submitted batch - batch_id=%s, requests=%s", batch.id, len(lines))
+        
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            await asyncio.sleep(poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+        logger.info("Batch finished - batch_id=%s, status=%s", batch.id, batch.status)
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    entry = orjson.loads(line)
+                    results[entry["custom_id"]] = _batch_result(entry)
+        
+        # Requests the batch never answered (expired, cancelled, failed)
+        for case_id in case_ids:
+            results.setdefault(case_id, {
+                "case_id": case_id,
+                "status": "error",
+                "response": "",
+                "tool_calls": [],
+                "error": f"Batch {batch.status}"
+            })
+        return results
+    
     async def _execute_workflow(
         self,
         case: CaseContext,
-        user_message: str
+        user_message: str,
+        plan: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Execute the warranty workflow for a case.
@@ -291,12 +1382,14 @@ class WarrantyOrchestrator:
         Args:
             case: Current case context
             user_message: User's latest message
+            plan: Plan already fetched for the current case state, if any
             
         Returns:
             Result dictionary with response and optional actions
         """
         # Step 1: Get plan from planner
-        plan = await self._get_plan(case, user_message)
+        if plan is None:
+            plan = await self._get_plan(case, user_message)
         
         if not plan or "error" in plan:
             return {
@@ -308,7 +1401,7 @@ class WarrantyOrchestrator:
         try:
             self._validate_plan(plan, case)
         except PlanValidationError as e:
-            logger.error(f"Plan validation failed - error={str(e)}")
+            logger.error("Plan validation failed - error=%s", e)
             return {
                 "response": "I need to verify some information. " + str(e),
                 "action": None
@@ -330,11 +1423,8 @@ class WarrantyOrchestrator:
         For POC, this calls the planner logic directly.
         In production, this would call the Planner MCP server.
         """
-        # Import planner logic directly for POC
-        from src.mcp_servers.planner import generate_plan
-        
         context = case.to_dict()
-        plan_result = generate_plan(context, user_message)
+        plan_result = await self._run_sync(planner.generate_plan, context, user_message)
         
         if plan_result.get("status") == "ok":
             return plan_result.get("data", {})
@@ -347,12 +1437,23 @@ class WarrantyOrchestrator:
         
         Raises PlanValidationError if constraints are violated.
         
-        NOTE: For POC, we trust the planner's constraint enforcement.
-        The planner already validates workflow order internally.
+        Workflow constraints (satisfied either by the case state or by an
+        earlier step in the same plan):
+        - Product-branch tools require the warranty record (product type)
+        - PayPal link generation requires a territory check
+        - Asking to proceed and logging a decline require calculated charges
         """
         steps = plan.get("plan", [])
         
-        # Basic validation only - check step types are valid
+        # Constraints already satisfied by earlier turns
+        done = 0
+        if case.product_type:
+            done |= _WARRANTY_LOOKUP
+        if case.potential_charges is not None:
+            done |= _CHARGES
+        if case.territory_checked:
+            done |= _TERRITORY
+        
         for step in steps:
             step_type = step.get("step_type")
             
@@ -369,11 +1470,20 @@ class WarrantyOrchestrator:
                     action_type = action_type.value
                 if action_type and action_type not in ACTION_TYPES:
                     raise PlanValidationError(f"Invalid action type: {action_type}")
-        
-        # The planner enforces workflow constraints internally:
-        # - HEAT: charges → ask to proceed → territory check → PayPal/directory
-        # - SALT: warranty check → queue or directory
-        # No need to duplicate validation here for POC
+            
+            elif step_type == "CALL_TOOL":
+                bit = _TOOL_BITS.get(step.get("tool_name", ""), 0)
+                if bit & _BRANCH_TOOLS and not done & _WARRANTY_LOOKUP:
+                    raise PlanValidationError("Warranty record must be retrieved first.")
+                if bit & _PAYPAL and not done & _TERRITORY:
+                    raise PlanValidationError("Service territory must be checked before payment.")
+                if bit & _DECLINE and not done & _CHARGES:
+                    raise PlanValidationError("Charges must be calculated before logging a decline.")
+                done |= bit
+            
+            elif step_type == "ASK_USER_FOR_INFO":
+                if "proceed_confirmation" in (step.get("required_fields") or []) and not done & _CHARGES:
+                    raise PlanValidationError("Charges must be calculated before asking to proceed.")
     
     async def _execute_plan(
         self,
@@ -391,9 +1501,10 @@ class WarrantyOrchestrator:
         action = None
         action_data = None
         
-        for step in steps:
+        for batch in _batch_plan_steps(steps):
+            step = batch[0]
             step_type = step.get("step_type")
-            logger.info(f"Executing step - type={step_type}, description={step.get('description', 'N/A')}")
+            logger.info("Executing step - type=%s, description=%s", step_type, step.get('description', 'N/A'))
             
             if step_type == "RETURN_ACTION":
                 action = step.get("action_type")
@@ -401,7 +1512,7 @@ class WarrantyOrchestrator:
                     "message": step.get("message", "")
                 }
                 responses.append(step.get("message", ""))
-                logger.info(f"RETURN_ACTION: {action}")
+                logger.info("RETURN_ACTION: %s", action)
                 break  # Stop processing after return action
             
             elif step_type == "ASK_USER_FOR_INFO":
@@ -410,23 +1521,35 @@ class WarrantyOrchestrator:
                 action_data = {
                     "required_fields": step.get("required_fields", [])
                 }
-                logger.info(f"ASK_USER_FOR_INFO: {step.get('required_fields', [])}")
+                logger.info("ASK_USER_FOR_INFO: %s", step.get('required_fields', []))
+                if "proceed_confirmation" in (step.get("required_fields") or []):
+                    # A "yes" leads straight to the territory check; run it
+                    # while the customer reads the charges
+                    self._speculate(case, "check_territory", {"location": case.location.model_dump()})
                 break  # Wait for user response
             
             elif step_type == "CALL_TOOL":
-                tool_name = step.get("tool_name")
-                tool_args = step.get("tool_args", {})
+                # Independent tools in the batch run concurrently
+                logger.info("CALL_TOOL: %s", [s.get('tool_name') for s in batch])
+                defaults = _CaseDefaults(case)
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [
+                        tg.create_task(_tool_error_boundary(
+                            self._execute_tool(s.get("tool_name"), s.get("tool_args", {}), case, defaults)
+                        ))
+                        for s in batch
+                    ]
+                results = [t.result() for t in tasks]
                 
-                logger.info(f"CALL_TOOL: {tool_name}")
-                result = await self._execute_tool(tool_name, tool_args, case)
-                logger.info(f"Tool result status: {result.get('status', 'unknown')}")
-                
-                # Update case context with tool results
-                self._update_case_from_tool_result(case, tool_name, result)
+                # Apply case updates in plan order for deterministic state
+                for tool_step, result in zip(batch, results):
+                    tool_name = tool_step.get("tool_name")
+                    logger.info("Tool result status: %s -> %s", tool_name, result.get('status', 'unknown'))
+                    self._update_case_from_tool_result(case, tool_name, result)
             
             elif step_type == "RESPOND_TO_USER":
                 responses.append(step.get("message", ""))
-                logger.info(f"RESPOND_TO_USER: {step.get('message', '')[:50]}...")
+                logger.info("RESPOND_TO_USER: %s...", step.get('message', '')[:50])
         
         # Combine responses
         full_response = "\n\n".join(responses) if responses else "I'm here to help with your warranty request."
@@ -437,167 +1560,327 @@ class WarrantyOrchestrator:
             "action_data": action_data
         }
     
+    async def _run_sync(self, fn, *args, **kwargs) -> Any:
+        """Run a synchronous tool function on the tool executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._tool_executor,
+            functools.partial(fn, *args, **kwargs)
+        )
+    
     async def _execute_tool(
         self,
         tool_name: str,
         tool_args: Dict[str, Any],
-        case: CaseContext
+        case: CaseContext,
+        defaults: Optional[_CaseDefaults] = None
     ) -> Dict[str, Any]:
         """
         Execute a tool and return the result.
         
-        Routes to the appropriate MCP server or local tool.
+        Routes to the appropriate MCP server or local tool. Tools run
+        together should share one defaults object so the case is dumped
+        once for all of them.
         """
-        logger.info(f"Executing tool - tool_name={tool_name}, args={tool_args}")
+        logger.debug("Executing tool - tool_name=%s, args=%s", tool_name, tool_args)
         
-        try:
-            # Import MCP server functions for POC (direct call)
-            if tool_name == "get_plan":
-                # Call the Planner MCP to get a structured execution plan
-                from src.mcp_servers.planner import generate_plan
-                user_message = tool_args.get("user_message", "")
-                context = case.to_dict()
-                plan_result = generate_plan(context, user_message)
-                logger.info(f"PLANNER MCP: Generated plan with {len(plan_result.get('data', {}).get('plan', []))} steps")
-                return plan_result
-            
-            elif tool_name == "get_warranty_record":
-                from src.mcp_servers.warranty_docs import get_warranty_record
-                result = get_warranty_record(
-                    product_id=tool_args.get("product_id") or case.product_id,
-                    serial_number=tool_args.get("serial_number")
-                )
-                logger.info(f"WARRANTY DOCS MCP: Retrieved warranty record for {tool_args.get('product_id') or case.product_id}")
-                return result
-            
-            elif tool_name == "get_warranty_terms":
-                from src.mcp_servers.warranty_docs import get_warranty_terms
-                return get_warranty_terms()
-            
-            elif tool_name == "calculate_charges":
-                # Ensure we have all required args from case context if LLM didn't provide them
-                full_args = {
-                    "product_id": tool_args.get("product_id", case.product_id),
-                    "product_type": tool_args.get("product_type", case.product_type),
-                    "warranty_status": tool_args.get("warranty_status", case.warranty_status.model_dump() if case.warranty_status else {}),
-                    "location": tool_args.get("location", case.location.model_dump() if case.location else {})
-                }
-                result_str = self.compute_service.run(full_args)
-                return json.loads(result_str)
-            
-            elif tool_name == "route_to_queue":
-                from src.mcp_servers.actions import route_to_queue
-                return route_to_queue(
-                    queue=tool_args.get("queue"),
-                    case_context=tool_args.get("case_context", case.to_dict()),
-                    priority=tool_args.get("priority", "normal"),
-                    idempotency_key=tool_args.get("idempotency_key")
-                )
-            
-            elif tool_name == "get_service_directory":
-                from src.mcp_servers.actions import get_service_directory
-                return get_service_directory(
-                    product_type=tool_args.get("product_type"),
-                    location=tool_args.get("location", case.location.model_dump()),
-                    max_distance_miles=tool_args.get("max_distance_miles", 50),
-                    filters=tool_args.get("filters")
-                )
-            
-            elif tool_name == "check_territory":
-                from src.mcp_servers.actions import check_territory
-                return check_territory(
-                    location=tool_args.get("location", case.location.model_dump())
-                )
-            
-            elif tool_name == "generate_paypal_link":
-                from src.mcp_servers.actions import generate_paypal_link
-                return generate_paypal_link(
-                    amount=tool_args.get("amount", case.potential_charges or 0),
-                    metadata=tool_args.get("metadata", {"case_id": case.case_id}),
-                    currency=tool_args.get("currency", "USD"),
-                    idempotency_key=tool_args.get("idempotency_key")
-                )
-            
-            elif tool_name == "log_decline_reason":
-                from src.mcp_servers.actions import log_decline_reason
-                return log_decline_reason(
-                    reason=tool_args.get("reason", ""),
-                    context=tool_args.get("context", case.to_dict()),
-                    idempotency_key=tool_args.get("idempotency_key")
-                )
-            
-            elif tool_name == "notify_next_steps":
-                from src.mcp_servers.actions import notify_next_steps
-                return notify_next_steps(
-                    channel=tool_args.get("channel", case.channel),
-                    template_id=tool_args.get("template_id"),
-                    context=tool_args.get("context", {}),
-                    recipient=tool_args.get("recipient")
-                )
-            
-            elif tool_name == "run_calculation":
-                # Code interpreter for math operations
-                code = tool_args.get("code", "")
-                description = tool_args.get("description", "Calculation")
-                
-                logger.info(f"CODE INTERPRETER: {description}")
-                logger.info(f"Code to execute:\n{code}")
-                
-                # Execute in a safe environment with datetime available
-                import io
-                import contextlib
-                from datetime import datetime, date, timedelta
-                
-                # Capture stdout
-                stdout_capture = io.StringIO()
-                local_vars = {
-                    "datetime": datetime,
-                    "date": date,
-                    "timedelta": timedelta,
-                    "today": date.today(),
-                    "now": datetime.now()
-                }
-                
+        if tool_name in SPECULATIVE_TOOLS:
+            self._expire_speculative()
+            entry = self._speculative.pop(_speculation_key(case.case_id, tool_name, tool_args), None)
+            if entry is not None:
+                task = entry[1]
                 try:
-                    with contextlib.redirect_stdout(stdout_capture):
-                        exec(code, {"__builtins__": __builtins__}, local_vars)
-                    
-                    output = stdout_capture.getvalue().strip()
-                    logger.info(f"CODE INTERPRETER result: {output}")
-                    
-                    return {
-                        "status": "ok",
-                        "data": {
-                            "description": description,
-                            "output": output,
-                            "variables": {k: str(v) for k, v in local_vars.items() 
-                                         if not k.startswith("_") and k not in ["datetime", "date", "timedelta", "today", "now"]}
-                        }
-                    }
+                    result = await task
+                    logger.info("Using speculative result - tool_name=%s", tool_name)
+                    return result
                 except Exception as e:
-                    logger.error(f"CODE INTERPRETER error: {str(e)}")
-                    return {
-                        "status": "error",
-                        "error_code": "CALCULATION_ERROR",
-                        "message": str(e)
-                    }
-            
-            else:
-                logger.warning(f"Unknown tool: {tool_name}")
-                return {
-                    "status": "error",
-                    "error_code": "UNKNOWN_TOOL",
-                    "message": f"Tool not found: {tool_name}"
-                }
-                
+                    logger.warning("Speculative %s failed, re-running - error=%s", tool_name, e)
+        
+        handler = self._tool_handlers.get(tool_name)
+        if handler is None:
+            logger.warning("Unknown tool: %s", tool_name)
+            return {
+                "status": "error",
+                "error_code": "UNKNOWN_TOOL",
+                "message": f"Tool not found: {tool_name}"
+            }
+        
+        try:
+            return await handler(tool_args, case, defaults or _CaseDefaults(case))
         except Exception as e:
-            logger.error(f"Tool execution failed: {tool_name} - error={str(e)}")
+            logger.error("Tool execution failed: %s - error=%s", tool_name, e)
             return {
                 "status": "error",
                 "error_code": "TOOL_ERROR",
                 "message": str(e)
             }
     
+    def _speculate(self, case: CaseContext, tool_name: str, tool_args: Dict[str, Any]) -> None:
+        """
+        Start a read-only tool in the background for the case's likely next turn.
+        
+        The result is picked up by _execute_tool if called with the same
+        case, tool and args; otherwise it is eventually evicted.
+        """
+        if tool_name not in SPECULATIVE_TOOLS:
+            return
+        self._expire_speculative()
+        key = _speculation_key(case.case_id, tool_name, tool_args)
+        if key in self._speculative:
+            return
+        
+        task = asyncio.create_task(self._tool_handlers[tool_name](tool_args, case, _CaseDefaults(case)))
+        # Results may never be claimed; don't warn about unretrieved errors
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._speculative[key] = (time.monotonic() + TOOL_CACHE_TTL_SECONDS, task)
+        while len(self._speculative) > MAX_SPECULATIVE_RESULTS:
+            _, (_, stale) = self._speculative.popitem(last=False)
+            stale.cancel()
+        logger.info("Speculatively running %s for case_id=%s", tool_name, case.case_id)
+    
+    def _expire_speculative(self) -> None:
+        """Drop speculative results older than TOOL_CACHE_TTL_SECONDS (oldest first)."""
+        now = time.monotonic()
+        while self._speculative:
+            key, (expires_at, task) = next(iter(self._speculative.items()))
+            if expires_at > now:
+                break
+            del self._speculative[key]
+            task.cancel()
+    
+    async def _plan_and_prefetch(self, case: CaseContext, user_message: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the plan and start its first read-only lookups, so a fallback
+        after a failed loop (or the model calling the same tools) finds
+        them done. None if planning failed.
+        """
+        try:
+            plan = await self._get_plan(case, user_message)
+        except Exception as e:
+            logger.warning("Planning failed - error=%s", e)
+            return None
+        self._prefetch_plan_reads(case, plan)
+        return plan
+    
+    def _prefetch_plan_reads(self, case: CaseContext, plan: Optional[Dict[str, Any]]) -> None:
+        """Speculatively run the read-only tools in the plan's first batch."""
+        batches = _batch_plan_steps((plan or {}).get("plan") or [])
+        if batches and batches[0][0].get("step_type") == "CALL_TOOL":
+            for step in batches[0]:
+                self._speculate(case, step.get("tool_name"), step.get("tool_args") or {})
+    
+    # ------------------------------------------------------------------
+    # Tool handlers: fill in missing args from the case and call the
+    # MCP server function (direct call for POC) on the tool executor
+    # ------------------------------------------------------------------
+    
+    async def _tool_get_plan(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        # Call the Planner MCP to get a structured execution plan
+        user_message = tool_args.get("user_message", "")
+        plan_result = await self._run_sync(planner.generate_plan, defaults.context(), user_message)
+        logger.info("PLANNER MCP: Generated plan with %s steps", len(plan_result.get('data', {}).get('plan', [])))
+        return plan_result
+    
+    async def _tool_get_warranty_record(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        kwargs = {
+            "product_id": tool_args.get("product_id") or case.product_id,
+            "serial_number": tool_args.get("serial_number")
+        }
+        result = await self._coalescer.run(
+            ("get_warranty_record", _canonical_args(kwargs)),
+            lambda: self._run_sync(warranty_docs.get_warranty_record, **kwargs)
+        )
+        logger.info("WARRANTY DOCS MCP: Retrieved warranty record for %s", tool_args.get('product_id') or case.product_id)
+        return result
+    
+    async def _tool_get_warranty_terms(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        return await self._coalescer.run(
+            ("get_warranty_terms",),
+            lambda: self._run_sync(warranty_docs.get_warranty_terms)
+        )
+    
+    async def _tool_calculate_charges(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        # Ensure we have all required args from case context if LLM didn't provide them
+        full_args = {
+            "product_id": tool_args.get("product_id", case.product_id),
+            "product_type": tool_args.get("product_type", case.product_type),
+            "warranty_status": _arg(tool_args, "warranty_status", defaults.warranty_status),
+            "location": _arg(tool_args, "location", defaults.location)
+        }
+        return await self._run_sync(self.compute_service.compute, full_args)
+    
+    async def _tool_route_to_queue(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        return await self._run_sync(
+            actions.route_to_queue,
+            queue=tool_args.get("queue"),
+            case_context=_arg(tool_args, "case_context", defaults.context),
+            priority=tool_args.get("priority", "normal"),
+            idempotency_key=tool_args.get("idempotency_key")
+        )
+    
+    async def _tool_get_service_directory(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        kwargs = {
+            "product_type": tool_args.get("product_type"),
+            "location": _arg(tool_args, "location", defaults.location),
+            "max_distance_miles": tool_args.get("max_distance_miles", 50),
+            "filters": tool_args.get("filters")
+        }
+        return await self._coalescer.run(
+            ("get_service_directory", _canonical_args(kwargs)),
+            lambda: self._run_sync(actions.get_service_directory, **kwargs)
+        )
+    
+    async def _tool_check_territory(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        location = _arg(tool_args, "location", defaults.location)
+        return await self._coalescer.run(
+            ("check_territory", _canonical_args({"location": location})),
+            lambda: self._run_sync(actions.check_territory, location=location)
+        )
+    
+    async def _tool_generate_paypal_link(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        return await self._run_sync(
+            actions.generate_paypal_link,
+            amount=tool_args.get("amount", case.potential_charges or 0),
+            metadata=tool_args.get("metadata", {"case_id": case.case_id}),
+            currency=tool_args.get("currency", "USD"),
+            idempotency_key=tool_args.get("idempotency_key")
+        )
+    
+    async def _tool_log_decline_reason(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        return await self._run_sync(
+            actions.log_decline_reason,
+            reason=tool_args.get("reason", ""),
+            context=_arg(tool_args, "context", defaults.context),
+            idempotency_key=tool_args.get("idempotency_key")
+        )
+    
+    async def _tool_notify_next_steps(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        return await self._run_sync(
+            actions.notify_next_steps,
+            channel=tool_args.get("channel", case.channel),
+            template_id=tool_args.get("template_id"),
+            context=tool_args.get("context", {}),
+            recipient=tool_args.get("recipient")
+        )
+    
+    async def _tool_run_calculation(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        # Code interpreter for math operations
+        code = tool_args.get("code", "")
+        description = tool_args.get("description", "Calculation")
+        
+        logger.info("CODE INTERPRETER: %s", description)
+        logger.info("Code to execute:\n%s", code)
+        
+        try:
+            return await self._calculations.run(code, description, CALCULATION_TIMEOUT_SECONDS)
+        except TimeoutError:
+            logger.warning("CODE INTERPRETER timed out after %ss", CALCULATION_TIMEOUT_SECONDS)
+            return {
+                "status": "error",
+                "error_code": "CALCULATION_TIMEOUT",
+                "message": f"Calculation did not finish within {CALCULATION_TIMEOUT_SECONDS:g} seconds"
+            }
+    
+    async def _tool_fetch_tool_result(
+        self,
+        tool_args: Dict[str, Any],
+        case: CaseContext,
+        defaults: _CaseDefaults
+    ) -> Dict[str, Any]:
+        ref = tool_args.get("ref", "")
+        stored = await self._response_cache.get(ref) if ref.startswith("toolres:") else None
+        if stored is None:
+            return {
+                "status": "error",
+                "error_code": "RESULT_NOT_FOUND",
+                "message": f"No stored tool result for ref: {ref}"
+            }
+        return orjson.loads(stored)
+    
+    async def _tool_result_content(self, tool_name: str, result: Dict[str, Any]) -> str:
+        """
+        Serialize a tool result for the LLM.
+        
+        Fields the LLM already has are dropped first. Results still over
+        TOOL_RESULT_INLINE_BYTES are stored for TOOL_RESULT_TTL_SECONDS and
+        replaced by a summary and a reference, so later iterations do not
+        re-send the whole payload.
+        """
+        compact = _truncate_for_history(tool_name, result)
+        if COMPACT_TOOL_RESULTS:
+            compact = _columnar(compact)
+        content = _dump_tool_json(compact)
+        if len(content) <= TOOL_RESULT_INLINE_BYTES or tool_name == "fetch_tool_result":
+            return content
+        
+        # The stored copy is the full result, for when the summary is not enough
+        if compact is not result:
+            content = _dump_tool_json(result)
+        ref = f"toolres:{uuid.uuid4().hex}"
+        await self._response_cache.set(ref, content, TOOL_RESULT_TTL_SECONDS)
+        data = result.get("data")
+        return orjson.dumps({
+            "status": result.get("status", "unknown"),
+            "summary": self._summarize_tool_result(tool_name, result),
+            "ref": ref,
+            "fields": list(data) if isinstance(data, dict) else []
+        }).decode()
+    
     def _update_case_from_tool_result(
         self,
         case: CaseContext,
@@ -608,39 +1891,16 @@ class WarrantyOrchestrator:
         if result.get("status") != "ok":
             return
         
-        data = result.get("data", {})
-        
-        if tool_name == "get_warranty_record":
-            # Update product and warranty info
-            case.product_type = data.get("product_type")
-            case.product_name = data.get("product_name")
-            case.purchase_date = data.get("purchase_date")
-            
-            warranty_data = data.get("warranty_status", {})
-            case.warranty_status = WarrantyStatus(
-                active=warranty_data.get("active", False),
-                coverage_types=warranty_data.get("coverage_types", []),
-                all_coverage=warranty_data.get("all_coverage", {})
-            )
-        
-        elif tool_name == "calculate_charges":
-            summary = data.get("summary", {})
-            case.potential_charges = summary.get("total_potential_charges")
-        
-        elif tool_name == "check_territory":
-            case.territory_checked = True
-            case.territory_serviceable = data.get("serviceable", False)
-        
-        elif tool_name == "route_to_queue":
-            # Case ID from queue might override
-            if data.get("case_id"):
-                case.case_id = data["case_id"]
+        updater = _CASE_UPDATERS.get(tool_name)
+        if updater:
+            updater(case, result.get("data", {}))
     
     async def process_with_llm(
         self,
         case: CaseContext,
         user_message: str,
-        conversation_history: List[Dict[str, Any]] = None
+        conversation_history: List[Dict[str, Any]] = None,
+        on_delta: Optional[DeltaCallback] = None
     ) -> Dict[str, Any]:
         """
         Process request using Azure OpenAI with tool calling.
@@ -657,6 +1917,7 @@ class WarrantyOrchestrator:
             case: Current case context
             user_message: The user's latest message
             conversation_history: Optional list of previous messages in OpenAI format
+            on_delta: Optional async callback receiving response text as it streams
         """
         if not self.client:
             logger.warning("No Azure OpenAI client available - falling back to rule-based processing")
@@ -671,181 +1932,159 @@ class WarrantyOrchestrator:
         from datetime import date
         current_date = date.today().isoformat()
         
-        # Extract warranty details
-        warranty_expiry = None
-        coverage_limits = {}
-        if case.warranty_status:
-            warranty_expiry = getattr(case.warranty_status, 'expiration_date', None)
-            coverage_limits = getattr(case.warranty_status, 'all_coverage', {})
-        
-        # Build initial messages with system prompt
-        messages = [
-            {"role": "system", "content": self.system_prompt + """
-
-IMPORTANT RESPONSE GUIDELINES:
-- When you call a tool, wait for the result before responding
-- After getting tool results, provide a CONCISE response to the user
-- Do NOT explain your reasoning process or workflow steps to the user
-- Do NOT output code blocks or function call syntax in your response
-- Speak directly to the customer in a friendly, professional tone
-- If you need more information from the user, ask clearly and wait for their response
-
-CRITICAL - USE CODE INTERPRETER FOR ALL MATH:
-- NEVER do math calculations yourself - always use the run_calculation tool
-- Use run_calculation for: warranty days remaining, cost differences, coverage gaps, percentages, date arithmetic
-- Example: To find warranty days remaining, use run_calculation with Python code
-- Example: To find how much customer must pay if warranty covers $X but cost is $Y, use run_calculation
-- Always show the customer the calculation results clearly
-"""}
-        ]
+        # Identical turns (same case state, history and message) reuse the
+        # previous answer instead of calling the model again
+        cache_key = None
+        if LLM_CACHE_TTL_SECONDS > 0:
+            cache_key = response_cache_key(
+                self.system_prompt,
+                case.state_json(),
+                [{"role": m.get("role"), "content": m.get("content", "")} for m in conversation_history or []],
+                user_message,
+                current_date
+            )
+            cached = await self._response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(">>> LLM response cache hit")
+                result = orjson.loads(cached)
+                # Bring the case to the state the original turn left it in
+                for call in result.get("tool_calls", []):
+                    self._update_case_from_tool_result(
+                        case, call["tool"], {"status": call["status"], "data": call.get("result_data", {})}
+                    )
+                if on_delta and result.get("response"):
+                    await on_delta(result["response"])
+                return result
         
-        # Add conversation history if provided (excluding system messages)
-        if conversation_history:
-            for msg in conversation_history:
-                if msg.get("role") != "system":
-                    messages.append({"role": msg["role"], "content": msg.get("content", "")})
-            logger.info(f"Added {len(conversation_history)} messages from conversation history")
+        # The rule-based plan runs alongside the first completion: it bounds
+        # later iterations and is reused by the fallback below if the case
+        # is unchanged. Only a context-only turn waits for it up front,
+        # since a scripted plan then answers without the model.
+        plan_snapshot = case.to_json()
+        plan_task = asyncio.create_task(self._plan_and_prefetch(case, user_message))
+        
+        if not user_message.strip():
+            plan = await plan_task
+            if _is_deterministic_plan(plan):
+                logger.info(">>> Deterministic plan - answering without the LLM")
+                result = await self._execute_workflow(case, user_message, plan=plan)
+                if on_delta and result.get("response"):
+                    await on_delta(result["response"])
+                return result
         
-        # Always append current context as the latest user message
-        context_message = f"""
-=== CURRENT DATE ===
-Today's Date: {current_date}
-
-=== CASE CONTEXT ===
-- Case ID: {case.case_id}
-- Product: {case.product_id} (Type: {case.product_type})
-- Product Name: {case.product_name or 'Unknown'}
-- Purchase Date: {getattr(case, 'purchase_date', 'Unknown')}
-- Location: {case.location.city}, {case.location.state} {case.location.zip if case.location else 'Unknown'}
-
-=== WARRANTY DETAILS ===
-- Warranty Active: {case.warranty_status.active if case.warranty_status else 'Unknown'}
-- Warranty Expiry Date: {warranty_expiry or 'Not specified'}
-- Coverage Types: {case.warranty_status.coverage_types if case.warranty_status else []}
-- Coverage Limits: {json.dumps(coverage_limits, default=str) if coverage_limits else 'Not specified'}
-
-=== CASE STATE ===
-- Customer Decision: {case.customer_decision.value if case.customer_decision else 'PENDING'}
-- Potential Charges: {case.potential_charges if case.potential_charges else 'Not calculated'}
-- Territory Checked: {case.territory_checked}
-- Territory Serviceable: {case.territory_serviceable}
-
-=== CUSTOMER MESSAGE ===
-{user_message}
-
-REMINDER: Use run_calculation tool for ANY math (days remaining, cost gaps, etc.)
-"""
-        messages.append({"role": "user", "content": context_message})
+        messages = self._build_messages(case, user_message, conversation_history, current_date)
         
-        max_iterations = 10  # Prevent infinite loops
+        max_iterations = MAX_LLM_ITERATIONS
+        answer_only = False  # Set once a terminal tool has run
         all_tool_calls = []  # Track all tool calls for logging
-        
-        for iteration in range(max_iterations):
+        # Side-effecting tools recorded when dispatched: a cancelled task's
+        # executor thread still finishes, so the call may have happened
+        # even if its result never arrives
+        dispatched_side_effects: List[str] = []
+        
+        # Bound the turn in wall-clock time too, so slow calls fall back to
+        # the rule-based answer instead of holding the caller indefinitely
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LLM_TURN_BUDGET_SECONDS
+        early_tasks: Dict[str, asyncio.Task] = {}
+        
+        for iteration in range(MAX_LLM_ITERATIONS):
+            if iteration == 1:
+                max_iterations = min(max_iterations, _iteration_limit(await plan_task))
+            if iteration >= max_iterations:
+                break
+            if loop.time() >= deadline:
+                logger.warning("LLM turn budget of %ss used up after %s iterations", LLM_TURN_BUDGET_SECONDS, iteration)
+                break
+            
             try:
                 logger.info("")
                 logger.info("-" * 50)
-                logger.info(f">>> LLM ITERATION {iteration + 1}")
-                logger.info(f"    Model: {self.deployment}")
-                logger.info(f"    Messages in context: {len(messages)}")
+                logger.info(">>> LLM ITERATION %s", iteration + 1)
+                logger.info("    Model: %s", self.deployment)
+                logger.info("    Messages in context: %s", len(messages))
                 logger.info("-" * 50)
                 
-                response = self.client.chat.completions.create(
-                    model=self.deployment,
-                    messages=messages,
-                    tools=self._get_tool_definitions(),
-                    tool_choice="auto",
-                    max_tokens=2000
-                )
+                # Read-only tools start as soon as their call has fully
+                # streamed, overlapping with the rest of the completion;
+                # side-effecting tools wait until the response is complete
+                early_tasks = {}
+                defaults = _CaseDefaults(case)
                 
-                message = response.choices[0].message
-                finish_reason = response.choices[0].finish_reason
+                def start_tool(call: Dict[str, Any]) -> None:
+                    name = call["function"]["name"]
+                    if name not in SIDE_EFFECT_TOOLS:
+                        args = _parse_tool_args(call["function"]["arguments"])
+                        early_tasks[call["id"]] = asyncio.create_task(self._execute_tool(name, args, case, defaults))
                 
-                logger.info(f"<<< LLM Response:")
-                logger.info(f"    Finish Reason: {finish_reason}")
-                logger.info(f"    Tool Calls: {len(message.tool_calls) if message.tool_calls else 0}")
-                if message.content:
-                    logger.info(f"    Content Preview: {message.content[:150]}...")
+                tools = self._get_tool_definitions(case)
+                # The turn deadline covers retries and queueing; each
+                # attempt's stream has its own timeout inside _complete
+                async with asyncio.timeout_at(deadline):
+                    content, tool_calls, finish_reason = await self._complete(
+                        on_delta,
+                        start_tool,
+                        deadline=deadline,
+                        model=self.deployment,
+                        messages=messages,
+                        tools=tools,
+                        # The last allowed iteration must answer rather than call more tools
+                        tool_choice="none" if answer_only or iteration == max_iterations - 1 else "auto",
+                        max_tokens=LLM_MAX_TOKENS,
+                        extra_body={"prompt_cache_key": self._prompt_cache_key(tools)}
+                    )
+                
+                logger.info("<<< LLM Response:")
+                logger.info("    Finish Reason: %s", finish_reason)
+                logger.info("    Tool Calls: %s", len(tool_calls))
+                if content:
+                    logger.info("    Content Preview: %s...", content[:150])
                 
                 # If LLM wants to call tools
-                if message.tool_calls:
+                if tool_calls:
                     # Add assistant message with tool calls to history
                     messages.append({
                         "role": "assistant",
-                        "content": message.content,
-                        "tool_calls": [
-                            {
-                                "id": tc.id,
-                                "type": "function",
-                                "function": {
-                                    "name": tc.function.name,
-                                    "arguments": tc.function.arguments
-                                }
-                            } for tc in message.tool_calls
-                        ]
+                        "content": content or None,
+                        "tool_calls": tool_calls
                     })
                     
-                    # Execute each tool call
-                    for tool_call in message.tool_calls:
-                        tool_name = tool_call.function.name
-                        try:
-                            tool_args = json.loads(tool_call.function.arguments)
-                        except json.JSONDecodeError:
-                            tool_args = {}
-                        
-                        logger.info("")
-                        logger.info(f"    ┌─── TOOL CALL: {tool_name} ───")
-                        logger.info(f"    │ Arguments: {json.dumps(tool_args, default=str, indent=2)[:500]}")
-                        
-                        # Execute the tool
-                        result = await self._execute_tool(tool_name, tool_args, case)
+                    # Parse arguments for every tool call up front
+                    parsed_calls = []
+                    for tool_call in tool_calls:
+                        tool_args = _parse_tool_args(tool_call["function"]["arguments"])
+                        parsed_calls.append((tool_call, tool_call["function"]["name"], tool_args))
+                    
+                    # The LLM emits tool calls together because they are independent,
+                    # so read-only tools run concurrently; side-effecting tools run
+                    # one after another in emitted order (e.g. route, then notify).
+                    # The task group cancels them all if this request is cancelled;
+                    # the error boundary keeps one failing tool from cancelling its peers.
+                    async with asyncio.timeout_at(deadline), asyncio.TaskGroup() as tg:
+                        tasks = []
+                        last_side_effect = None
+                        for tc, name, args in parsed_calls:
+                            call = early_tasks.pop(tc["id"], None) or self._execute_tool(name, args, case, defaults)
+                            if name in SIDE_EFFECT_TOOLS:
+                                dispatched_side_effects.append(name)
+                                call = _run_after(last_side_effect, call)
+                            task = tg.create_task(_tool_error_boundary(call))
+                            if name in SIDE_EFFECT_TOOLS:
+                                last_side_effect = task
+                            tasks.append(task)
+                    
+                    # Results are handled in emitted order to keep tool_call_id mapping;
+                    # case updates are applied here, one at a time, once every
+                    # call has finished, so state changes are deterministic
+                    for (tool_call, tool_name, tool_args), task in zip(parsed_calls, tasks):
+                        result = task.result()
+                        self._update_case_from_tool_result(case, tool_name, result)
                         
-                        # Log detailed result
                         result_status = result.get('status', 'unknown')
                         result_data = result.get('data', {})
-                        
-                        logger.info(f"    │ Status: {result_status}")
-                        if tool_name == "get_plan":
-                            plan_steps = result_data.get('plan', [])
-                            logger.info(f"    │ PLANNER RESULT:")
-                            logger.info(f"    │   Routing: {result_data.get('routing', 'N/A')}")
-                            logger.info(f"    │   Steps: {len(plan_steps)}")
-                            for i, step in enumerate(plan_steps):
-                                step_type = step.get('step_type', 'UNKNOWN')
-                                if hasattr(step_type, 'value'):
-                                    step_type = step_type.value
-                                logger.info(f"    │     {i+1}. {step_type}: {step.get('description', '')[:60]}")
-                        elif tool_name == "get_warranty_record":
-                            logger.info(f"    │ WARRANTY RECORD RESULT:")
-                            logger.info(f"    │   Product: {result_data.get('product_name', 'N/A')}")
-                            logger.info(f"    │   Type: {result_data.get('product_type', 'N/A')}")
-                            ws = result_data.get('warranty_status', {})
-                            logger.info(f"    │   Warranty Active: {ws.get('active', 'N/A')}")
-                            logger.info(f"    │   Coverage: {ws.get('coverage_types', [])}")
-                            logger.info(f"    │   Expiry: {ws.get('expiration_date', 'N/A')}")
-                        elif tool_name == "run_calculation":
-                            logger.info(f"    │ CALCULATION RESULT:")
-                            logger.info(f"    │   Description: {result_data.get('description', 'N/A')}")
-                            logger.info(f"    │   Output: {result_data.get('output', 'N/A')}")
-                        elif tool_name == "get_service_directory":
-                            providers = result_data.get('providers', [])
-                            logger.info(f"    │ SERVICE DIRECTORY RESULT:")
-                            logger.info(f"    │   Providers found: {len(providers)}")
-                            for p in providers[:3]:
-                                logger.info(f"    │     - {p.get('name', 'N/A')} ({p.get('distance_miles', 'N/A')} mi)")
-                        elif tool_name == "check_territory":
-                            logger.info(f"    │ TERRITORY CHECK RESULT:")
-                            logger.info(f"    │   Serviceable: {result_data.get('serviceable', 'N/A')}")
-                            logger.info(f"    │   Region: {result_data.get('region', 'N/A')}")
-                        elif tool_name == "generate_paypal_link":
-                            logger.info(f"    │ PAYPAL LINK RESULT:")
-                            logger.info(f"    │   Payment URL: {result_data.get('payment_url', 'N/A')[:50]}...")
-                        elif tool_name == "route_to_queue":
-                            logger.info(f"    │ QUEUE ROUTING RESULT:")
-                            logger.info(f"    │   Queue: {result_data.get('queue', 'N/A')}")
-                            logger.info(f"    │   Case ID: {result_data.get('case_id', 'N/A')}")
-                        else:
-                            logger.info(f"    │ Result Data: {json.dumps(result_data, default=str)[:300]}")
-                        logger.info(f"    └{'─' * 40}")
+                        # Skip building the detailed log lines when INFO is off
+                        if logger.isEnabledFor(logging.INFO):
+                            self._log_tool_result(tool_name, tool_args, result)
                         
                         # Track for response - include full result data for reporting
                         all_tool_calls.append({
@@ -859,117 +2098,211 @@ REMINDER: Use run_calculation tool for ANY math (days remaining, cost gaps, etc.
                         # Add tool result to messages
                         messages.append({
                             "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(result, default=str)
+                            "tool_call_id": tool_call["id"],
+                            "content": await self._tool_result_content(tool_name, result)
                         })
                     
+                        if tool_name == "get_plan" and result_status == "ok":
+                            max_iterations = min(max_iterations, iteration + 1 + _iteration_limit(result_data))
+                    
+                    if not TERMINAL_TOOLS.isdisjoint(name for _, name, _ in parsed_calls):
+                        answer_only = True
+                    
+                    # Keep the re-sent prompt from growing with every iteration
+                    trimmed = _trim_tool_results(messages)
+                    if trimmed:
+                        logger.info("Trimmed %s earlier tool results from the prompt", trimmed)
+                    
                     # Continue loop to get next LLM response
                     continue
                 
                 # No tool calls - LLM is done, return response
-                final_response = message.content or "I've processed your request. Is there anything else I can help you with?"
+                final_response = content or "I've processed your request. Is there anything else I can help you with?"
                 
                 logger.info("")
                 logger.info("=" * 70)
                 logger.info("<<< LLM FINAL RESPONSE")
                 logger.info("=" * 70)
-                logger.info(f"{final_response[:500]}")
+                logger.info("%s", final_response[:500])
                 logger.info("=" * 70)
                 
-                return {
+                result = {
                     "response": final_response,
                     "action": None,
                     "tool_calls": all_tool_calls
                 }
                 
+                # Only cache answers that are safe to replay for another case
+                if (
+                    cache_key
+                    and case.case_id not in final_response
+                    and not any(c["tool"] in SIDE_EFFECT_TOOLS for c in all_tool_calls)
+                ):
+                    await self._response_cache.set(
+                        cache_key, _dump_tool_json(result), LLM_CACHE_TTL_SECONDS
+                    )
+                
+                plan_task.cancel()
+                return result
+                
+            except TimeoutError:
+                logger.warning("LLM iteration %s timed out", iteration + 1)
+                break
             except Exception as e:
-                logger.error(f"LLM iteration {iteration + 1} failed - error={str(e)}", exc_info=True)
+                # Full traceback for the first failure and every Nth after it
+                logger.error(
+                    "LLM iteration %s failed - error=%r", iteration + 1, e,
+                    exc_info=next(self._llm_error_count) % LLM_ERROR_TRACEBACK_EVERY == 0
+                )
                 break
+            finally:
+                # Tools started early but never collected (timeout or error)
+                for task in early_tasks.values():
+                    task.cancel()
+        
+        # Once a side-effecting tool has been dispatched, the rule-based
+        # workflow could repeat it (route, notify, PayPal); reply from what
+        # already ran instead
+        if dispatched_side_effects:
+            logger.warning(
+                "LLM loop ended after side-effecting tools were dispatched (%s) - replying without the rule-based rerun",
+                ", ".join(dispatched_side_effects)
+            )
+            completed = [c["summary"] for c in all_tool_calls if c["tool"] in SIDE_EFFECT_TOOLS]
+            response = STILL_WORKING_RESPONSE
+            if completed:
+                response += f" So far: {'; '.join(completed)}."
+            plan_task.cancel()
+            return {
+                "response": response,
+                "action": None,
+                "tool_calls": all_tool_calls
+            }
         
         # If we exit the loop without a response, fall back to rule-based
         logger.warning("LLM loop exhausted or failed - falling back to rule-based processing")
-        return await self._execute_workflow(case, user_message)
+        plan = await plan_task
+        if case.to_json() != plan_snapshot:
+            plan = None
+        return await self._execute_workflow(case, user_message, plan=plan)
+    
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE_LLM_ERRORS),
+        wait=_wait_retry_after(wait_random_exponential(min=1, max=30)),
+        stop=stop_any(stop_after_attempt(5), _stop_past_deadline),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
+    async def _complete(
+        self,
+        on_delta: Optional[DeltaCallback] = None,
+        on_tool_call: Optional[Callable[[Dict[str, Any]], None]] = None,
+        deadline: Optional[float] = None,
+        **kwargs
+    ) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+        """
+        Stream one chat completion and return (content, tool_calls, finish_reason).
+        
+        The semaphore slot is held until the stream is fully consumed.
+        Transient errors opening the stream are retried with jittered
+        exponential backoff (or the Retry-After delay); retrying stops early
+        if the wait would pass deadline (event loop time). A failure after
+        streaming has started raises LLMStreamInterrupted instead, so
+        retries never repeat deltas. Calls wait for room in the
+        tokens-per-minute budget first; LLM_CALL_TIMEOUT_SECONDS bounds
+        each attempt's stream, not those waits.
+        """
+        await self._token_budget.wait()
+        async with self._llm_semaphore:
+            async with asyncio.timeout(LLM_CALL_TIMEOUT_SECONDS):
+                stream = await self.client.chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+                try:
+                    return await _collect_stream(stream, on_delta, on_tool_call, self._token_budget.record)
+                except RETRYABLE_LLM_ERRORS as e:
+                    raise LLMStreamInterrupted(str(e)) from e
     
-    def _get_tool_definitions(self) -> List[Dict[str, Any]]:
-        """Load tool definitions from config/tools/*.json files."""
-        import glob
+    def _build_messages(
+        self,
+        case: CaseContext,
+        user_message: str,
+        conversation_history: Optional[List[Dict[str, Any]]],
+        current_date: str
+    ) -> List[Dict[str, Any]]:
+        """Build the first-turn chat messages for a case and customer message."""
+        # Build initial messages with system prompt
+        messages = [{"role": "system", "content": self._system_message}]
         
-        tools = []
-        tools_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "config", "tools")
+        # Add conversation history if provided (excluding system messages)
+        if conversation_history:
+            for msg in conversation_history:
+                if msg.get("role") != "system":
+                    messages.append({"role": msg["role"], "content": msg.get("content", "")})
+            logger.info("Added %s messages from conversation history", len(conversation_history))
         
-        # Load all JSON files from config/tools/
-        json_files = glob.glob(os.path.join(tools_dir, "*.json"))
+        # Always append current context as the latest user message
+        context_message = f"""
+=== CURRENT DATE ===
+Today's Date: {current_date}
+
+=== CASE STATE ===
+{orjson.dumps(case.to_llm_compact(), default=str).decode()}
+
+=== CUSTOMER MESSAGE ===
+{user_message}
+
+REMINDER: Use run_calculation tool for ANY math (days remaining, cost gaps, etc.)
+"""
+        messages.append({"role": "user", "content": context_message})
+        return messages
+    
+    def _get_tool_definitions(self, case: Optional[CaseContext] = None) -> List[Dict[str, Any]]:
+        """
+        Return the tool definitions for an LLM call.
         
-        for json_file in json_files:
-            try:
-                with open(json_file, 'r') as f:
-                    tool_def = json.load(f)
-                    tools.append(tool_def)
-                    logger.debug(f"Loaded tool definition: {tool_def.get('function', {}).get('name', 'unknown')} from {json_file}")
-            except Exception as e:
-                logger.warning(f"Failed to load tool definition from {json_file}: {e}")
-        
-        # Add the run_calculation tool (code interpreter - not from MCP)
-        tools.append({
-            "type": "function",
-            "function": {
-                "name": "run_calculation",
-                "description": "Execute Python code for complex calculations. Use this for ANY math operations including: warranty days remaining, cost differences, coverage gap calculations, date arithmetic, percentage calculations, etc. The orchestrator should NEVER do math directly - always use this tool.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "code": {
-                            "type": "string",
-                            "description": "Python code to execute. Must print() the final result. Has access to datetime module."
-                        },
-                        "description": {
-                            "type": "string",
-                            "description": "Brief description of what calculation is being performed"
-                        }
-                    },
-                    "required": ["code", "description"]
-                }
-            }
-        })
+        With a case, tools whose result is already on the case are left out.
+        """
+        if RELOAD_TOOLS:
+            _load_tool_definitions.cache_clear()
+            _tool_definitions_without.cache_clear()
+        if case is None:
+            return _load_tool_definitions()
+        excluded = frozenset(name for name, answered in ANSWERED_TOOL_CHECKS if answered(case))
+        if not excluded:
+            return _load_tool_definitions()
+        return _tool_definitions_without(excluded)
+    
+    def _prompt_cache_key(self, tools: List[Dict[str, Any]]) -> str:
+        """Prompt cache key for a call using this system message and tool list."""
+        return _prompt_cache_key(self._system_message, tuple(t["function"]["name"] for t in tools))
+    
+    def _log_tool_result(self, tool_name: str, tool_args: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Log a tool call and the interesting parts of its result as one record."""
+        result_status = result.get('status', 'unknown')
+        
+        lines = [
+            "",
+            f"    ┌─── TOOL CALL: {tool_name} ───",
+            f"    │ Arguments: {_short_repr(tool_args, 500)}",
+            f"    │ Status: {result_status}",
+            *_TOOL_LOGGERS.get(tool_name, _default_log)(result.get('data', {})),
+            "    └" + "─" * 40,
+        ]
         
-        logger.info(f"Loaded {len(tools)} tool definitions from {tools_dir}")
-        return tools
+        # One record per tool call; the fields let structured handlers filter on them
+        logger.info("%s", "\n".join(lines), extra={"tool": tool_name, "tool_status": result_status})
     
     def _summarize_tool_result(self, tool_name: str, result: Dict[str, Any]) -> str:
         """Create a brief summary of a tool result for logging."""
         status = result.get("status", "unknown")
-        data = result.get("data", {})
         
         if status != "ok":
             return f"Error: {result.get('message', 'Unknown error')}"
         
-        if tool_name == "get_plan":
-            plan = data.get("plan", [])
-            routing = data.get("routing", "N/A")
-            return f"Plan with {len(plan)} steps, routing={routing}"
-        
-        elif tool_name == "get_warranty_record":
-            ws = data.get("warranty_status", {})
-            return f"Warranty active={ws.get('active', 'N/A')}, coverage={ws.get('coverage_types', [])}"
-        
-        elif tool_name == "run_calculation":
-            return f"Calculated: {data.get('output', 'N/A')}"
-        
-        elif tool_name == "get_service_directory":
-            providers = data.get("providers", [])
-            return f"Found {len(providers)} service providers"
-        
-        elif tool_name == "check_territory":
-            return f"Serviceable: {data.get('serviceable', 'N/A')}"
-        
-        elif tool_name == "generate_paypal_link":
-            return f"Payment link generated"
-        
-        elif tool_name == "route_to_queue":
-            return f"Routed to queue: {data.get('queue', 'N/A')}"
-        
-        elif tool_name == "calculate_charges":
-            summary = data.get("summary", {})
-            return f"Total charges: ${summary.get('total_potential_charges', 0)}"
-        
-        return f"Result: {status}"
+        summarizer = _TOOL_SUMMARIZERS.get(tool_name)
+        if summarizer is None:
+            return f"Result: {status}"
+        return summarizer(result.get("data", {}))
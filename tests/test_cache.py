@@ -0,0 +1,74 @@
+"""
+Unit Tests for Orchestrator Caches
+
+Tests the LLM response cache and in-flight request coalescing.
+"""
+
+import asyncio
+import pytest
+from src.orchestrator.cache import InMemoryTTLCache, RequestCoalescer, response_cache_key
+
+
+class TestResponseCacheKey:
+    """Tests for LLM response cache keys."""
+
+    def test_message_is_normalized(self):
+        """Test that whitespace differences share a key but case differences do not."""
+        key = lambda msg: response_cache_key("prompt", "{}", [], msg, "2026-01-01")
+
+        assert key("Am I covered?") == key("  Am I   covered? ")
+        assert key("Serial AB12") != key("serial ab12")
+        assert key("Am I covered?") != key("Am I covered now?")
+
+
+class TestInMemoryTTLCache:
+    """Tests for the process-local TTL cache."""
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_missing(self):
+        """Test that entries are not returned after their TTL."""
+        cache = InMemoryTTLCache()
+
+        await cache.set("live", "a", ttl_seconds=60)
+        await cache.set("dead", "b", ttl_seconds=0)
+
+        assert await cache.get("live") == "a"
+        assert await cache.get("dead") is None
+
+
+class TestRequestCoalescer:
+    """Tests for collapsing identical in-flight calls."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_run_once(self):
+        """Test that concurrent callers with one key share a single call."""
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"status": "ok"}
+
+        results = await asyncio.gather(*(coalescer.run("terms", fetch) for _ in range(5)))
+        await coalescer.run("terms", fetch)
+
+        assert len(calls) == 2
+        assert all(r == {"status": "ok"} for r in results)
+
+    @pytest.mark.asyncio
+    async def test_kept_results_are_reused_until_expiry(self):
+        """Test that accepted results are reused within the TTL and errors are not."""
+        coalescer = RequestCoalescer(ttl_seconds=60, keep=lambda r: r["status"] == "ok")
+        calls = []
+
+        async def fetch(status):
+            calls.append(status)
+            return {"status": status}
+
+        await coalescer.run("record", lambda: fetch("ok"))
+        await coalescer.run("record", lambda: fetch("ok"))
+        await coalescer.run("territory", lambda: fetch("error"))
+        await coalescer.run("territory", lambda: fetch("error"))
+
+        assert calls == ["ok", "error", "error"]
@@ -0,0 +1,186 @@
+"""
+Unit Tests for Case Context Models
+
+Tests serialization and state helpers on CaseContext.
+"""
+
+import json
+import pytest
+from src.models import CaseContext
+
+
+class TestCaseSerialization:
+    """Tests for CaseContext serialization."""
+
+    def test_to_json_matches_to_dict(self):
+        """Test that to_json encodes the same view as to_dict."""
+        case = CaseContext(
+            product_id="HEAT-001",
+            product_type="HEAT",
+            location={"zip": "77001", "state": "TX"},
+            potential_charges=220.0
+        )
+
+        assert json.loads(case.to_json()) == json.loads(json.dumps(case.to_dict()))
+
+    def test_to_json_excludes_internal_fields(self):
+        """Test that fields outside the tool-call view are not serialized."""
+        case = CaseContext(customer_name="John Smith")
+        case.add_user_message("hello")
+
+        data = json.loads(case.to_json())
+
+        assert "customer_name" not in data
+        assert "user_messages" not in data
+        assert "created_at" not in data
+
+    def test_tool_call_view_carries_product_name(self):
+        """Test that a known product name reaches the planner, so it is not asked for again."""
+        from src.mcp_servers.planner import generate_plan
+
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        plan = generate_plan(case.to_dict(), "My heater is broken")["data"]["plan"]
+
+        assert all(step["step_type"] != "ASK_USER_FOR_INFO" for step in plan)
+
+
+class TestLLMCompact:
+    """Tests for the short-key prompt view of a case."""
+
+    def test_compact_omits_unknown_values(self):
+        """Test that only known values appear, under short keys."""
+        from src.models.case_context import LLM_COMPACT_LEGEND
+
+        case = CaseContext(product_id="HEAT-001", product_type="HEAT", location={"zip": "77001"})
+
+        compact = case.to_llm_compact()
+
+        assert compact == {"id": case.case_id, "pid": "HEAT-001", "pt": "HEAT", "loc": {"zip": "77001"}, "cd": "PENDING"}
+        assert all(f"{key}=" in LLM_COMPACT_LEGEND for key in ("id", "pid", "pt", "loc", "cd", "wa", "ch", "tc", "ts"))
+
+    def test_explicit_inactive_warranty_is_kept(self):
+        """Test that a known inactive warranty is not dropped as unknown."""
+        case = CaseContext(warranty_status={"active": False})
+
+        assert case.to_llm_compact()["wa"] is False
+
+
+class TestCaseJsonCache:
+    """Tests for reuse and invalidation of cached JSON views."""
+
+    def test_unchanged_case_reuses_json(self):
+        """Test that serializing an unchanged case returns the cached string."""
+        case = CaseContext(product_id="HEAT-001")
+
+        assert case.to_json() is case.to_json()
+
+    def test_field_and_nested_changes_invalidate(self):
+        """Test that top-level, nested and update() changes are reflected."""
+        from src.models import WarrantyStatus
+
+        case = CaseContext(product_id="HEAT-001")
+        case.to_json()
+
+        case.potential_charges = 220.0
+        assert json.loads(case.to_json())["potential_charges"] == 220.0
+
+        case.location.zip = "77001"
+        assert json.loads(case.to_json())["location"]["zip"] == "77001"
+
+        case.warranty_status = WarrantyStatus(active=True)
+        case.warranty_status.coverage_types = ["parts"]
+        assert json.loads(case.to_json())["warranty_status"]["coverage_types"] == ["parts"]
+
+        case.update(customer_decision="PROCEED")
+        assert json.loads(case.to_json())["customer_decision"] == "PROCEED"
+
+    def test_copy_does_not_share_cache(self):
+        """Test that a copied case tracks its own nested changes."""
+        case = CaseContext(location={"zip": "77001"})
+        case.to_json()
+
+        copy = case.model_copy(deep=True)
+        copy.location.zip = "90210"
+
+        assert json.loads(copy.to_json())["location"]["zip"] == "90210"
+        assert json.loads(case.to_json())["location"]["zip"] == "77001"
+
+
+class TestCaseUpdate:
+    """Tests for CaseContext.update."""
+
+    def test_update_stores_enum_value(self):
+        """Test that enum members and known strings are stored as values."""
+        from src.models.case_context import CustomerDecision
+
+        case = CaseContext()
+        case.update(customer_decision=CustomerDecision.PROCEED, product_type="HEAT")
+
+        assert case.customer_decision == "PROCEED"
+        assert type(case.customer_decision) is str
+        assert case.product_type == "HEAT"
+        assert "customer_decision" in case.model_fields_set
+
+    def test_update_sets_regular_fields(self):
+        """Test that non-enum fields are still updated."""
+        case = CaseContext()
+        case.update(product_id="SALT-001", unknown_field="ignored")
+
+        assert case.product_id == "SALT-001"
+        assert not hasattr(case, "unknown_field")
+
+    def test_update_unhashable_enum_value_takes_normal_path(self):
+        """Test that a dict for an enum field skips the frozenset lookup instead of raising TypeError."""
+        case = CaseContext()
+        case.update(product_type={"type": "HEAT"})
+
+        assert case.product_type == {"type": "HEAT"}
+
+
+class TestCaseId:
+    """Tests for generated case IDs."""
+
+    def test_case_id_format(self):
+        """Test that case IDs keep the CASE-YYYYMMDD-XXXXXXXX format."""
+        import re
+        from datetime import datetime
+
+        case_id = CaseContext().case_id
+
+        assert re.fullmatch(r"CASE-\d{8}-[0-9A-F]{8}", case_id)
+        assert case_id[5:13] == datetime.now().strftime("%Y%m%d")
+
+    def test_case_ids_are_unique(self):
+        """Test that consecutive cases get distinct IDs."""
+        ids = {CaseContext().case_id for _ in range(100)}
+        assert len(ids) == 100
+
+    def test_case_ids_do_not_follow_the_random_module(self):
+        """Test that reseeding random does not repeat IDs, since an ID is enough to resume a case."""
+        import random
+
+        random.seed(1234)
+        first = CaseContext().case_id
+        random.seed(1234)
+
+        assert CaseContext().case_id != first
+
+
+class TestCasePersistence:
+    """Tests for the JSON round trip used by the Redis case store."""
+
+    def test_json_round_trip(self):
+        """Test that a stored case is restored with the same state."""
+        case = CaseContext(
+            product_id="HEAT-001",
+            product_type="HEAT",
+            location={"zip": "77001", "state": "TX"},
+            warranty_status={"active": True, "coverage_types": ["parts"]},
+            potential_charges=220.0
+        )
+        case.add_user_message("hello")
+
+        restored = CaseContext.model_validate_json(case.model_dump_json())
+
+        assert restored == case
@@ -0,0 +1,72 @@
+"""
+Unit Tests for Case Stores
+
+Tests case persistence between conversation turns.
+"""
+
+import pytest
+from src.models import CaseContext
+from src.orchestrator.case_store import InMemoryCaseStore
+
+
+class TestInMemoryCaseStore:
+    """Tests for the process-local case store."""
+
+    @pytest.mark.asyncio
+    async def test_save_and_get(self):
+        """Test that a saved case is returned by ID."""
+        store = InMemoryCaseStore()
+        case = CaseContext(product_id="HEAT-001")
+
+        await store.save(case)
+
+        assert await store.get(case.case_id) is case
+        assert await store.get("CASE-UNKNOWN") is None
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_case_is_evicted(self):
+        """Test that the store stays bounded and keeps recently used cases."""
+        store = InMemoryCaseStore(max_size=2)
+        first, second, third = CaseContext(), CaseContext(), CaseContext()
+
+        await store.save(first)
+        await store.save(second)
+        await store.get(first.case_id)
+        await store.save(third)
+
+        assert len(store) == 2
+        assert first.case_id in store
+        assert second.case_id not in store
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.expiries = []
+
+    async def getex(self, key, ex=None):
+        self.expiries.append((key, ex))
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.expiries.append((key, ex))
+        self.values[key] = value
+
+
+class TestRedisCaseStore:
+    """Tests for the Redis-backed case store."""
+
+    @pytest.mark.asyncio
+    async def test_reads_refresh_the_ttl(self):
+        """Test that a case round-trips as JSON and each access resets its TTL."""
+        from src.orchestrator.case_store import RedisCaseStore
+
+        store = RedisCaseStore.__new__(RedisCaseStore)
+        store._redis, store.ttl_seconds, store.key_prefix = _FakeRedis(), 600, "case:"
+        case = CaseContext(product_id="HEAT-001", location={"zip": "77001"})
+
+        await store.save(case)
+        loaded = await store.get(case.case_id)
+
+        assert loaded == case
+        assert store._redis.expiries == [(f"case:{case.case_id}", 600)] * 2
@@ -12,6 +12,7 @@ from src.compute.service import (
     calculate_prorated_amount,
     ComputeService
 )
+from src.compute.calculator import compile_calculation, run_calculation
 
 
 class TestWarrantyWindow:
@@ -312,6 +313,103 @@ class TestComputeService:
         assert data["status"] == "ok"
         assert "proration_percent" in data["data"]
 
+    def test_service_compute_matches_run(self):
+        """Test service.compute() returns the dict that run() encodes."""
+        service = ComputeService()
+        tool_call = {
+            "product_id": "HEAT-001",
+            "product_type": "HEAT",
+            "warranty_status": {"active": True, "coverage_types": ["parts"]},
+            "location": {"state": "CA"}
+        }
+
+        import json
+        assert service.compute(tool_call) == json.loads(service.run(tool_call))
+
+
+
+class TestCalculator:
+    """Tests for the run_calculation code interpreter."""
+
+    def test_date_arithmetic(self):
+        """Test a typical days-remaining snippet, including a comprehension."""
+        result = run_calculation(
+            "expiry = date(2026, 3, 1)\n"
+            "days = (expiry - date(2026, 1, 6)).days\n"
+            "print(days, [days * w for w in (1, 7)])"
+        )
+
+        assert result["status"] == "ok"
+        assert result["data"]["output"] == "54 [54, 378]"
+        assert result["data"]["variables"] == {"expiry": "2026-03-01", "days": "54"}
+
+    def test_compiled_code_is_reused(self):
+        """Test that identical snippets reuse one compiled code object."""
+        code = "print(round(220.0 * 1.25, 2))"
+
+        assert compile_calculation(code) is compile_calculation(code)
+        assert run_calculation(code)["data"]["output"] == "275.0"
+
+    def test_unsafe_names_are_unavailable(self):
+        """Test that imports and builtins outside the whitelist fail."""
+        assert run_calculation("import os")["error_code"] == "CALCULATION_ERROR"
+        assert run_calculation("open('x')")["error_code"] == "CALCULATION_ERROR"
+        assert run_calculation("import math\nprint(math.ceil(2.1))")["data"]["output"] == "3"
+
+    def test_sandbox_escapes_are_rejected(self):
+        """Test that module re-exports and dunder walks cannot reach os."""
+        escapes = (
+            "import datetime\nprint(datetime.sys.modules['os'].getpid())",
+            "print(().__class__.__base__.__subclasses__())",
+            "print('{0.__class__}'.format(1))",
+            "from datetime import sys",
+        )
+
+        for code in escapes:
+            assert run_calculation(code)["status"] == "error", code
+        result = run_calculation("import decimal\nprint(decimal.Decimal('1.5') * 2)")
+        assert result["data"]["output"] == "3.0"
+        assert result["data"]["variables"] == {}
+
+    def test_only_allowed_syntax_compiles(self):
+        """Test that the AST allow-list admits calculations and rejects other statements."""
+        allowed = (
+            "def months(d):\n    return d // 30\n"
+            "total = 0\nfor x in range(3):\n    total += x\n"
+            "print(months(95), total, {k: v for k, v in zip('ab', (1, 2))}, f'{total:.1f}')"
+        )
+        rejected = (
+            "class A:\n    pass",
+            "with open('x') as f:\n    pass",
+            "try:\n    x = 1\nexcept Exception as e:\n    pass",
+            "global x",
+            "del today",
+            "def gen():\n    yield 1",
+        )
+
+        assert run_calculation(allowed)["data"]["output"] == "3 3 {'a': 1, 'b': 2} 3.0"
+        for code in rejected:
+            result = run_calculation(code)
+            assert result["error_code"] == "CALCULATION_ERROR", code
+            assert "not allowed" in result["message"], code
+
+    def test_results_are_reused_unless_clock_is_read(self):
+        """Test that repeat snippets hit the result cache, but now() snippets rerun."""
+        code = "print((date(2026, 3, 1) - today).days)"
+        clock = "def stamp():\n    return now.isoformat()\nprint(stamp())"
+
+        assert run_calculation(code, "days left") is run_calculation(code, "days left")
+        assert run_calculation(clock) is not run_calculation(clock)
+        assert run_calculation("print(")["error_code"] == "CALCULATION_ERROR"
+
+    def test_date_today_is_not_cached(self):
+        """Test that snippets calling a clock method rerun instead of reusing a stale result."""
+        for code in (
+            "print(date.today())",
+            "from datetime import datetime as dt\nprint(dt.now())",
+            "import datetime\nprint(datetime.datetime.utcnow())",
+        ):
+            assert run_calculation(code) is not run_calculation(code)
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -82,7 +82,7 @@ class TestGoldenPaths:
         3. User declines with a reason
         4. Reason is logged
         """
-        case = orchestrator.get_or_create_case({
+        case = await orchestrator.get_or_create_case({
             "logged_in": True,
             "has_registered_products": True,
             "product_id": "HEAT-001",
@@ -122,7 +122,7 @@ class TestGoldenPaths:
         3. Territory is not serviceable
         4. Service directory is returned
         """
-        case = orchestrator.get_or_create_case({
+        case = await orchestrator.get_or_create_case({
             "logged_in": True,
             "has_registered_products": True,
             "product_id": "HEAT-001",
@@ -198,7 +198,7 @@ class TestGoldenPaths:
         1. User has SALT product with expired warranty
         2. Service directory is returned
         """
-        case = orchestrator.get_or_create_case({
+        case = await orchestrator.get_or_create_case({
             "logged_in": True,
             "has_registered_products": True,
             "product_id": "SALT-002",  # Older product with expired parts/labor
@@ -0,0 +1,1163 @@
+"""
+Unit Tests for the Warranty Orchestrator
+
+Tests orchestrator internals: plan step batching and tool execution.
+"""
+
+import pytest
+from src.mcp_servers.planner import generate_plan
+from src.orchestrator.warranty_orchestrator import _batch_plan_steps
+
+
+def _tool_step(tool_name, **tool_args):
+    return {"step_type": "CALL_TOOL", "description": tool_name, "tool_name": tool_name, "tool_args": tool_args}
+
+
+class TestPlanBatching:
+    """Tests for grouping independent CALL_TOOL steps."""
+
+    def test_independent_tools_share_a_batch(self):
+        """Test that tools without case-field conflicts are batched."""
+        steps = [
+            _tool_step("check_territory", location={"zip": "77001"}),
+            _tool_step("get_service_directory", product_type="HEAT"),
+            {"step_type": "RESPOND_TO_USER", "description": "done", "message": "ok"}
+        ]
+
+        batches = _batch_plan_steps(steps)
+
+        assert [len(b) for b in batches] == [2, 1]
+
+    def test_side_effects_keep_plan_order(self):
+        """Test that the notification waits for the queue routing before it."""
+        steps = [
+            _tool_step("route_to_queue", queue="WarrantySalt"),
+            _tool_step("notify_next_steps", channel="chat"),
+            _tool_step("get_warranty_terms")
+        ]
+
+        batches = _batch_plan_steps(steps)
+
+        assert [[s["tool_name"] for s in b] for b in batches] == [
+            ["route_to_queue"], ["notify_next_steps", "get_warranty_terms"]
+        ]
+
+    def test_territory_check_precedes_paypal(self):
+        """Test that PayPal link generation waits for the territory check."""
+        steps = [
+            _tool_step("check_territory", location={"zip": "77001"}),
+            _tool_step("generate_paypal_link", amount=100.0)
+        ]
+
+        batches = _batch_plan_steps(steps)
+
+        assert [[s["tool_name"] for s in b] for b in batches] == [
+            ["check_territory"], ["generate_paypal_link"]
+        ]
+
+    def test_non_tool_steps_are_never_grouped(self):
+        """Test that ASK/RESPOND steps stay in their own batches."""
+        plan = generate_plan({
+            "product_id": "HEAT-001",
+            "product_name": "Heat Pump",
+            "product_type": "HEAT",
+            "location": {"zip": "77001"},
+            "warranty_status": {"active": True}
+        }, "help")["data"]["plan"]
+
+        batches = _batch_plan_steps(plan)
+
+        assert sum(len(b) for b in batches) == len(plan)
+        assert all(len(b) == 1 for b in batches if b[0]["step_type"] != "CALL_TOOL")
+
+
+class TestPlanValidation:
+    """Tests for workflow constraints enforced on planner output."""
+
+    def test_paypal_requires_territory_check(self):
+        """Test that a PayPal step without a territory check is rejected."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+        from src.orchestrator.warranty_orchestrator import PlanValidationError
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001", product_type="HEAT", potential_charges=220.0)
+
+        with pytest.raises(PlanValidationError):
+            orchestrator._validate_plan({"plan": [_tool_step("generate_paypal_link", amount=220.0)]}, case)
+
+        orchestrator._validate_plan({"plan": [
+            _tool_step("check_territory", location={"zip": "77001"}),
+            _tool_step("generate_paypal_link", amount=220.0)
+        ]}, case)
+
+    def test_proceed_question_requires_charges(self):
+        """Test that asking to proceed needs charges from the case or the plan."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+        from src.orchestrator.warranty_orchestrator import PlanValidationError
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001", product_type="HEAT")
+        ask = {"step_type": "ASK_USER_FOR_INFO", "required_fields": ["proceed_confirmation"]}
+
+        with pytest.raises(PlanValidationError):
+            orchestrator._validate_plan({"plan": [ask]}, case)
+
+        orchestrator._validate_plan({"plan": [_tool_step("calculate_charges"), ask]}, case)
+
+
+class TestCaseUpdates:
+    """Tests for applying tool results to the case."""
+
+    def test_tool_results_update_case(self):
+        """Test that each state-changing tool updates its case fields."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001")
+
+        orchestrator._update_case_from_tool_result(case, "check_territory", {"status": "ok", "data": {"serviceable": True}})
+        orchestrator._update_case_from_tool_result(case, "calculate_charges", {"status": "ok", "data": {"summary": {"total_potential_charges": 220.0}}})
+        orchestrator._update_case_from_tool_result(case, "get_warranty_terms", {"status": "ok", "data": {}})
+        orchestrator._update_case_from_tool_result(case, "route_to_queue", {"status": "error", "data": {"case_id": "X"}})
+
+        assert case.territory_checked and case.territory_serviceable
+        assert case.potential_charges == 220.0
+        assert case.case_id != "X"
+
+
+class TestCaseDefaults:
+    """Tests for sharing case-derived tool argument defaults."""
+
+    @pytest.mark.asyncio
+    async def test_batched_tools_share_one_case_dump(self, monkeypatch):
+        """Test that tools in one plan batch dump the case once, and only if needed."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001", product_type="HEAT", location={"zip": "77001", "state": "TX"})
+        dumps = []
+        original = CaseContext.to_dict
+        monkeypatch.setattr(CaseContext, "to_dict", lambda self: dumps.append(1) or original(self))
+
+        await orchestrator._execute_plan({"plan": [
+            _tool_step("calculate_charges"),
+            _tool_step("get_service_directory", product_type="HEAT"),
+            _tool_step("check_territory", location={"zip": "77001"})
+        ]}, case, "What will it cost?")
+        assert len(dumps) == 1
+
+        await orchestrator._execute_plan({"plan": [
+            _tool_step("check_territory", location={"zip": "77001"})
+        ]}, case, "Am I covered?")
+        assert len(dumps) == 1
+
+
+def _ns(**fields):
+    return type("Obj", (), fields)()
+
+
+class _FakeToolCall:
+    def __init__(self, call_id, name, arguments):
+        self.id = call_id
+        self.name = name
+        self.arguments = arguments
+
+
+def _chunks(content, tool_calls):
+    """Split a scripted turn into stream chunks the way the API emits them."""
+    def chunk(content=None, tool_calls=None, finish_reason=None):
+        delta = _ns(content=content, tool_calls=tool_calls)
+        return _ns(choices=[_ns(delta=delta, finish_reason=finish_reason)])
+
+    yield _ns(choices=[])  # content-filter preamble
+    for word in (content or "").split(" "):
+        if word:
+            yield chunk(content=word + " ")
+    for index, tc in enumerate(tool_calls or []):
+        half = len(tc.arguments) // 2
+        yield chunk(tool_calls=[_ns(index=index, id=tc.id, function=_ns(name=tc.name, arguments=tc.arguments[:half]))])
+        yield chunk(tool_calls=[_ns(index=index, id=None, function=_ns(name=None, arguments=tc.arguments[half:]))])
+    yield chunk(finish_reason="tool_calls" if tool_calls else "stop")
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _FakeCompletions:
+    """Replays a scripted sequence of streamed chat completions."""
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content, tool_calls = self.turns.pop(0)
+        return _FakeStream(_chunks(content, tool_calls))
+
+
+def _fake_client(turns):
+    completions = _FakeCompletions(turns)
+    client = _ns(chat=_ns(completions=completions))
+    return client, completions
+
+
+class TestLLMToolDispatch:
+    """Tests for tool dispatch inside the LLM agentic loop."""
+
+    @pytest.mark.asyncio
+    async def test_parallel_tool_calls_keep_order(self):
+        """Test that multiple tool calls are answered in emitted order."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [
+                _FakeToolCall("call_1", "check_territory", '{"location": {"zip": "77001"}}'),
+                _FakeToolCall("call_2", "get_warranty_terms", "{}"),
+                _FakeToolCall("call_3", "no_such_tool", "not json")
+            ]),
+            ("All done", None)
+        ])
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        result = await orchestrator.process_with_llm(case, "Is my area covered?")
+
+        assert result["response"].strip() == "All done"
+        assert [c["tool"] for c in result["tool_calls"]] == [
+            "check_territory", "get_warranty_terms", "no_such_tool"
+        ]
+        tool_messages = [m for m in completions.requests[-1]["messages"] if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_messages] == ["call_1", "call_2", "call_3"]
+        assert result["tool_calls"][2]["status"] == "error"
+        assert case.territory_checked is True
+
+    @pytest.mark.asyncio
+    async def test_side_effect_tools_run_in_emitted_order(self, monkeypatch):
+        """Test that a notification waits for the queue routing emitted before it."""
+        import time
+        from src.models import CaseContext
+        from src.mcp_servers import actions
+        from src.orchestrator import WarrantyOrchestrator
+
+        events = []
+        route, notify = actions.route_to_queue, actions.notify_next_steps
+
+        def slow_route(**kwargs):
+            time.sleep(0.05)
+            events.append("routed")
+            return route(**kwargs)
+
+        monkeypatch.setattr(actions, "route_to_queue", slow_route)
+        monkeypatch.setattr(actions, "notify_next_steps", lambda **kw: events.append("notified") or notify(**kw))
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, _ = _fake_client([
+            (None, [
+                _FakeToolCall("call_1", "route_to_queue", '{"queue": "WarrantySalt"}'),
+                _FakeToolCall("call_2", "notify_next_steps", '{"channel": "chat", "template_id": "warranty_queued"}')
+            ]),
+            ("Your case is queued", None)
+        ])
+        case = CaseContext(product_id="SALT-001", product_name="Softener", location={"zip": "77001"})
+
+        await orchestrator.process_with_llm(case, "Please open a claim")
+
+        assert events == ["routed", "notified"]
+
+    @pytest.mark.asyncio
+    async def test_stream_request_yields_deltas_then_final(self):
+        """Test that streamed text arrives before the final result."""
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, _ = _fake_client([("Your heater is covered", None)])
+
+        events = [e async for e in orchestrator.stream_request({
+            "messages": [{"role": "user", "content": "Am I covered?"}],
+            "context": {
+                "product_id": "HEAT-001",
+                "product_name": "Heat Pump",
+                "location": {"zip": "77001"},
+                "warranty_status": {"active": True}
+            }
+        })]
+
+        assert [e["type"] for e in events[:-1]] == ["delta"] * 4
+        assert events[-1]["type"] == "final"
+        assert events[-1]["response"] == "".join(e["content"] for e in events[:-1])
+
+
+class TestIterationLimits:
+    """Tests for ending the agentic loop once more tool calls cannot help."""
+
+    def test_limit_follows_plan_length(self):
+        """Test that short plans allow fewer iterations than the hard cap."""
+        from src.orchestrator.warranty_orchestrator import MAX_LLM_ITERATIONS, _iteration_limit
+
+        assert _iteration_limit({"plan": [_tool_step("get_warranty_record")]}) == 3
+        assert _iteration_limit({"plan": [_tool_step("x")] * 20}) == MAX_LLM_ITERATIONS
+        assert _iteration_limit(None) == MAX_LLM_ITERATIONS
+
+    @pytest.mark.asyncio
+    async def test_terminal_tool_forces_final_answer(self):
+        """Test that the completion after a terminal tool may not call tools."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [_FakeToolCall("call_1", "log_decline_reason", '{"reason": "too expensive"}')]),
+            ("Noted, thanks", None)
+        ])
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        await orchestrator.process_with_llm(case, "No thanks, too expensive")
+
+        assert [r["tool_choice"] for r in completions.requests] == ["auto", "none"]
+
+
+class TestToolLogging:
+    """Tests for per-tool-call diagnostic logging."""
+
+    def test_tool_call_is_one_log_record(self, caplog):
+        """Test that a tool call's boxed summary is emitted as a single record."""
+        import logging
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        result = {"status": "ok", "data": {"providers": [{"name": "A", "distance_miles": 3}] * 5}}
+
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="src.orchestrator.warranty_orchestrator"):
+            orchestrator._log_tool_result("get_service_directory", {"product_type": "HEAT"}, result)
+
+        assert len(caplog.records) == 1
+        record = caplog.records[0]
+        assert record.tool == "get_service_directory" and record.tool_status == "ok"
+        assert "Providers found: 5" in record.getMessage()
+
+    def test_previews_are_bounded(self):
+        """Test that large argument and result previews stay within their limit."""
+        from src.orchestrator.warranty_orchestrator import _short_repr
+
+        large = {"plan": [{"step": i, "description": "x" * 1000} for i in range(10_000)]}
+
+        assert len(_short_repr(large, 300)) <= 300
+        assert _short_repr({"zip": "77001"}, 300) == "{'zip': '77001'}"
+
+
+class TestStartupCaching:
+    """Tests for config, prompt and tool definitions being loaded once per file version."""
+
+    def test_tool_definitions_are_reused(self):
+        """Test that every LLM turn gets the same tool definitions object."""
+        from src.orchestrator import WarrantyOrchestrator
+
+        first, second = WarrantyOrchestrator(), WarrantyOrchestrator()
+
+        assert first._get_tool_definitions() is second._get_tool_definitions()
+        assert first.system_prompt is second.system_prompt
+
+    def test_system_prompt_reloads_when_file_changes(self, tmp_path, monkeypatch):
+        """Test that the prompt is cached until its file is modified."""
+        import os
+        from src.orchestrator import warranty_orchestrator
+
+        prompt_file = tmp_path / "system_prompt.txt"
+        prompt_file.write_text("First prompt")
+        monkeypatch.setattr(warranty_orchestrator, "SYSTEM_PROMPT_PATH", str(prompt_file))
+
+        first = warranty_orchestrator._load_system_prompt()
+        assert warranty_orchestrator._load_system_prompt() is first
+
+        prompt_file.write_text("Second prompt")
+        os.utime(prompt_file, ns=(0, os.stat(prompt_file).st_mtime_ns + 1))
+
+        assert warranty_orchestrator._load_system_prompt() == "Second prompt"
+
+
+class TestShutdown:
+    """Tests for releasing the orchestrator's connections and threads."""
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_client_and_executor(self):
+        """Test that aclose closes the HTTP client and stops the tool threads."""
+        from types import SimpleNamespace
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        closed = []
+
+        async def close():
+            closed.append(True)
+
+        orchestrator.client = SimpleNamespace(close=close)
+
+        await orchestrator.aclose()
+
+        assert closed == [True]
+        with pytest.raises(RuntimeError):
+            orchestrator._tool_executor.submit(print)
+
+
+class TestTokenWarmUp:
+    """Tests for fetching the Azure AD token before the first request."""
+
+    @pytest.mark.asyncio
+    async def test_warm_up_fetches_a_token_off_the_event_loop(self, monkeypatch):
+        """Test that warm_up calls the token provider once, in a worker thread."""
+        import threading
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        threads = []
+        monkeypatch.setattr(warranty_orchestrator, "_get_token_provider", lambda: lambda: threads.append(threading.current_thread()) or "token")
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client = object()
+
+        await orchestrator.warm_up()
+        orchestrator._calculations.close()
+
+        assert len(threads) == 1 and threads[0] is not threading.main_thread()
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_tool_definitions(self, monkeypatch):
+        """Test that warm_up fills the tool definition cache before the first turn."""
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        monkeypatch.setattr(warranty_orchestrator, "_get_token_provider", lambda: lambda: "token")
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client = object()
+        warranty_orchestrator._load_tool_definitions.cache_clear()
+
+        await orchestrator.warm_up()
+        orchestrator._calculations.close()
+
+        assert warranty_orchestrator._load_tool_definitions.cache_info().currsize == 1
+
+
+class TestToolPruning:
+    """Tests for leaving already-answered tools out of LLM calls."""
+
+    def test_answered_tools_are_not_offered(self, monkeypatch):
+        """Test that tools whose result is on the case are dropped."""
+        from src.models import CaseContext, WarrantyStatus
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        tools = [
+            {"type": "function", "function": {"name": name}}
+            for name in ("get_warranty_record", "check_territory", "calculate_charges", "generate_paypal_link")
+        ]
+        monkeypatch.setattr(warranty_orchestrator, "_load_tool_definitions", lambda: tools)
+        warranty_orchestrator._tool_definitions_without.cache_clear()
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        def names():
+            return {t["function"]["name"] for t in orchestrator._get_tool_definitions(case)}
+
+        assert {"get_warranty_record", "check_territory", "calculate_charges"} <= names()
+
+        case.update(
+            product_type="HEAT",
+            warranty_status=WarrantyStatus(active=True),
+            territory_checked=True,
+            potential_charges=220.0
+        )
+
+        assert not {"get_warranty_record", "check_territory", "calculate_charges"} & names()
+        assert "generate_paypal_link" in names()
+        assert orchestrator._get_tool_definitions(case) is orchestrator._get_tool_definitions(case)
+
+    @pytest.mark.asyncio
+    async def test_prompt_cache_key_is_sent_and_stable(self):
+        """Test that each completion carries a prefix cache key shared across turns."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [_FakeToolCall("call_1", "get_warranty_terms", "{}")]),
+            ("Done", None)
+        ])
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        await orchestrator.process_with_llm(case, "What does my warranty cover?")
+
+        keys = [r["extra_body"]["prompt_cache_key"] for r in completions.requests]
+        assert len(keys) == 2 and keys[0] == keys[1]
+        assert keys[0] == WarrantyOrchestrator()._prompt_cache_key(completions.requests[0]["tools"])
+
+
+class TestToolReload:
+    """Tests for the development tool-definition reload flag."""
+
+    def test_reload_flag_rereads_definitions(self, monkeypatch):
+        """Test that WARRANTY_RELOAD_TOOLS picks up changed tool files."""
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        first = orchestrator._get_tool_definitions()
+        monkeypatch.setattr(warranty_orchestrator, "RELOAD_TOOLS", True)
+
+        reloaded = orchestrator._get_tool_definitions()
+
+        assert reloaded is not first
+        assert reloaded == first
+
+
+class TestHistoryTrimming:
+    """Tests for keeping the agentic loop prompt within its token budget."""
+
+    def test_oldest_tool_results_are_trimmed_first(self):
+        """Test that old results are stubbed while recent turns are kept."""
+        from src.orchestrator.warranty_orchestrator import TRIMMED_TOOL_RESULT, _trim_tool_results
+
+        messages = [{"role": "system", "content": "prompt"}, {"role": "user", "content": "hi"}]
+        for turn in range(5):
+            messages.append({"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{turn}", "type": "function", "function": {"name": "get_warranty_terms", "arguments": "{}"}}
+            ]})
+            messages.append({"role": "tool", "tool_call_id": f"call_{turn}", "content": "x" * 4000})
+
+        trimmed = _trim_tool_results(messages, token_budget=3500, keep_recent=3)
+
+        tool_contents = [m["content"] for m in messages if m["role"] == "tool"]
+        assert trimmed == 2
+        assert tool_contents[:2] == [TRIMMED_TOOL_RESULT] * 2
+        assert tool_contents[2:] == ["x" * 4000] * 3
+        assert _trim_tool_results(messages, token_budget=3500, keep_recent=3) == 0
+
+
+class TestToolResultReferences:
+    """Tests for sending large tool results to the LLM by reference."""
+
+    @pytest.mark.asyncio
+    async def test_large_result_is_stored_and_fetchable(self, monkeypatch):
+        """Test that an oversized result becomes a summary whose ref returns the full result."""
+        import json
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        monkeypatch.setattr(warranty_orchestrator, "TOOL_RESULT_INLINE_BYTES", 100)
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001")
+        result = {"status": "ok", "data": {"providers": [{"name": f"Provider {i}"} for i in range(10)]}}
+
+        content = json.loads(await orchestrator._tool_result_content("get_service_directory", result))
+        small = await orchestrator._tool_result_content("check_territory", {"status": "ok", "data": {}})
+
+        assert content["ref"].startswith("toolres:")
+        assert content["fields"] == ["providers"]
+        assert json.loads(small) == {"status": "ok", "data": {}}
+        assert await orchestrator._execute_tool("fetch_tool_result", {"ref": content["ref"]}, case) == result
+        missing = await orchestrator._execute_tool("fetch_tool_result", {"ref": "toolres:nope"}, case)
+        assert missing["error_code"] == "RESULT_NOT_FOUND"
+
+    def test_history_copy_drops_echoed_fields(self):
+        """Test that plan steps lose case copies and directory results lose echoed args."""
+        from src.orchestrator.warranty_orchestrator import _truncate_for_history
+
+        plan = generate_plan({
+            "product_id": "SALT-001",
+            "product_name": "Softener",
+            "product_type": "SALT",
+            "location": {"zip": "77001"},
+            "warranty_status": {"active": True}
+        }, "help")
+        directory = {"status": "ok", "data": {"product_type": "HEAT", "location": {"zip": "77001"}, "providers": []}}
+        terms = {"status": "ok", "data": {"terms": "..."}}
+
+        compact_plan = _truncate_for_history("get_plan", plan)
+
+        assert not any("case_context" in step.get("tool_args", {}) for step in compact_plan["data"]["plan"])
+        assert any("case_context" in step.get("tool_args", {}) for step in plan["data"]["plan"])
+        assert _truncate_for_history("get_service_directory", directory)["data"] == {"providers": []}
+        assert _truncate_for_history("get_warranty_terms", terms) is terms
+
+    def test_columnar_lists_name_fields_once(self):
+        """Test that same-shaped records become cols + rows and others are left alone."""
+        import orjson
+        from src.mcp_servers import actions
+        from src.orchestrator.warranty_orchestrator import _columnar
+
+        directory = actions.get_service_directory(product_type="HEAT", location={"zip": "77001"})
+        providers = directory["data"]["providers"]
+
+        table = _columnar(directory)["data"]["providers"]
+
+        assert table["cols"] == list(providers[0])
+        assert [dict(zip(table["cols"], row)) for row in table["rows"]] == providers
+        assert len(orjson.dumps(table)) < len(orjson.dumps(providers))
+        assert _columnar([{"a": 1}, {"b": 2}]) == [{"a": 1}, {"b": 2}]
+
+    @pytest.mark.asyncio
+    async def test_non_string_keys_are_serialized(self):
+        """Test that results keyed by numbers still encode, as with stdlib json."""
+        import json
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+
+        content = await orchestrator._tool_result_content("calculate_charges", {"status": "ok", "data": {1: 10.0}})
+
+        assert json.loads(content) == {"status": "ok", "data": {"1": 10.0}}
+
+    @pytest.mark.asyncio
+    async def test_non_string_keys_are_cached_with_the_turn(self, monkeypatch):
+        """Test that a numerically keyed result does not break the response cache write."""
+        from src.models import CaseContext
+        from src.mcp_servers import warranty_docs
+        from src.orchestrator import WarrantyOrchestrator
+
+        monkeypatch.setattr(warranty_docs, "get_warranty_terms", lambda **kw: {"status": "ok", "data": {2024: "terms"}})
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [_FakeToolCall("call_1", "get_warranty_terms", "{}")]),
+            ("Here are the terms", None),
+        ])
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        first = await orchestrator.process_with_llm(case, "What are the terms?")
+        again = await orchestrator.process_with_llm(case, "What are the terms?")
+
+        assert first["response"].strip() == again["response"].strip() == "Here are the terms"
+        assert len(completions.requests) == 2
+
+
+class TestStreamAssembly:
+    """Tests for assembling streamed completions."""
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_reported_as_soon_as_complete(self):
+        """Test that each tool call is handed off before later chunks are read."""
+        from src.orchestrator.warranty_orchestrator import _collect_stream
+
+        events = []
+        chunks = list(_chunks(None, [
+            _FakeToolCall("call_1", "check_territory", '{"location": {"zip": "77001"}}'),
+            _FakeToolCall("call_2", "get_warranty_terms", "{}")
+        ]))
+
+        class RecordingStream(_FakeStream):
+            async def __anext__(self):
+                chunk = await super().__anext__()
+                events.append("chunk")
+                return chunk
+
+        content, tool_calls, finish_reason = await _collect_stream(
+            RecordingStream(chunks),
+            on_tool_call=lambda call: events.append(call["id"])
+        )
+
+        assert [c["function"]["arguments"] for c in tool_calls] == ['{"location": {"zip": "77001"}}', "{}"]
+        assert finish_reason == "tool_calls"
+        # call_1 is complete once call_2's first fragment arrives (chunk 4)
+        assert events.index("call_1") == 4
+        assert events[-1] == "call_2"
+
+
+class TestResponseCache:
+    """Tests for reusing LLM responses across identical turns."""
+
+    @pytest.mark.asyncio
+    async def test_identical_turn_skips_model_call(self):
+        """Test that a second case in the same state is answered from cache."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [_FakeToolCall("call_1", "check_territory", '{"location": {"zip": "77001"}}')]),
+            ("Your heater is covered", None)
+        ])
+
+        for _ in range(2):
+            case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+            result = await orchestrator.process_with_llm(case, "Am I  covered?")
+
+        assert len(completions.requests) == 2
+        assert result["response"].strip() == "Your heater is covered"
+        assert case.territory_checked is True
+
+    @pytest.mark.asyncio
+    async def test_side_effect_turns_are_not_cached(self):
+        """Test that turns which routed a case are always sent to the model."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [_FakeToolCall("call_1", "route_to_queue", '{"queue": "WarrantySalt"}')]),
+            ("Queued", None),
+            (None, [_FakeToolCall("call_2", "route_to_queue", '{"queue": "WarrantySalt"}')]),
+            ("Queued", None)
+        ])
+
+        for _ in range(2):
+            case = CaseContext(product_id="SALT-001", product_name="Water Softener", location={"zip": "77001"})
+            await orchestrator.process_with_llm(case, "Please queue my case")
+
+        assert len(completions.requests) == 4
+
+
+class TestFallbackPlanPrefetch:
+    """Tests for reusing the turn's rule-based plan when the LLM loop fails."""
+
+    @pytest.mark.asyncio
+    async def test_fallback_reuses_prefetched_plan(self):
+        """Test that the rule-based fallback does not plan twice."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, _ = _fake_client([])  # every model call fails
+        calls = []
+        get_plan = orchestrator._get_plan
+
+        async def counting_get_plan(case, user_message):
+            calls.append(user_message)
+            return await get_plan(case, user_message)
+
+        orchestrator._get_plan = counting_get_plan
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        result = await orchestrator.process_with_llm(case, "help")
+
+        assert result["response"]
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_reuses_prefetched_lookup(self, monkeypatch):
+        """Test that the plan's record lookup, started alongside the loop, serves the fallback."""
+        from src.models import CaseContext
+        from src.mcp_servers import warranty_docs
+        from src.orchestrator import WarrantyOrchestrator
+
+        lookup = warranty_docs.get_warranty_record
+        calls = []
+        monkeypatch.setattr(warranty_docs, "get_warranty_record", lambda **kw: calls.append(kw) or lookup(**kw))
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, _ = _fake_client([])  # every model call fails
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        await orchestrator.process_with_llm(case, "help")
+
+        assert len(calls) == 1
+        assert len(orchestrator._speculative) == 0
+        assert case.product_type == "HEAT"
+
+    @pytest.mark.asyncio
+    async def test_model_call_does_not_wait_for_the_plan(self, monkeypatch):
+        """Test that the first completion starts while the planner is still running."""
+        import time
+        from src.models import CaseContext
+        from src.mcp_servers import planner
+        from src.orchestrator import WarrantyOrchestrator
+
+        events = []
+        generate_plan = planner.generate_plan
+
+        def slow_plan(*args):
+            time.sleep(0.2)
+            events.append("planned")
+            return generate_plan(*args)
+
+        monkeypatch.setattr(planner, "generate_plan", slow_plan)
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([])
+
+        async def failing_create(**kwargs):
+            events.append("model")
+            raise RuntimeError("model unavailable")
+
+        completions.create = failing_create
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        result = await orchestrator.process_with_llm(case, "help")
+
+        assert events == ["model", "planned"]
+        assert result["response"]
+
+
+class TestLoopDeadline:
+    """Tests for the wall-clock budget on the LLM loop."""
+
+    @pytest.mark.asyncio
+    async def test_slow_model_call_falls_back(self, monkeypatch):
+        """Test that a hung completion times out into the rule-based answer."""
+        import asyncio
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        monkeypatch.setattr(warranty_orchestrator, "LLM_CALL_TIMEOUT_SECONDS", 0.05)
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([])
+
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        completions.create = hang
+        case = CaseContext(product_id="HEAT-001", product_name="Heat Pump", location={"zip": "77001"})
+
+        result = await asyncio.wait_for(orchestrator.process_with_llm(case, "help"), timeout=2)
+
+        assert result["response"]
+
+    @pytest.mark.asyncio
+    async def test_timeout_after_side_effect_does_not_rerun_it(self, monkeypatch):
+        """Test that a deadline after route_to_queue replies instead of routing again."""
+        import asyncio
+        from src.models import CaseContext
+        from src.mcp_servers import actions
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        routes = []
+        route = actions.route_to_queue
+        monkeypatch.setattr(actions, "route_to_queue", lambda **kw: routes.append(kw) or route(**kw))
+        monkeypatch.setattr(warranty_orchestrator, "LLM_CALL_TIMEOUT_SECONDS", 0.05)
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([
+            (None, [_FakeToolCall("call_1", "route_to_queue", '{"queue": "WarrantySalt"}')])
+        ])
+        create = completions.create
+
+        async def hang_after_first(**kwargs):
+            if completions.turns:
+                return await create(**kwargs)
+            await asyncio.sleep(10)
+
+        completions.create = hang_after_first
+        case = CaseContext(
+            product_id="SALT-001", product_name="Softener", product_type="SALT", location={"zip": "77001"},
+            logged_in=True, has_registered_products=True, warranty_status={"active": True}
+        )
+
+        result = await asyncio.wait_for(orchestrator.process_with_llm(case, "Please open a claim"), timeout=2)
+
+        assert len(routes) == 1
+        assert result["response"].startswith(warranty_orchestrator.STILL_WORKING_RESPONSE)
+        assert [c["tool"] for c in result["tool_calls"]] == ["route_to_queue"]
+
+    @pytest.mark.asyncio
+    async def test_side_effect_outliving_the_deadline_is_not_rerun(self, monkeypatch):
+        """Test that a PayPal link still running at the deadline is not generated again."""
+        import asyncio
+        import time
+        from src.models import CaseContext
+        from src.mcp_servers import actions
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        links = []
+        generate = actions.generate_paypal_link
+
+        def slow_link(**kwargs):
+            time.sleep(0.3)
+            links.append(kwargs)
+            return generate(**kwargs)
+
+        monkeypatch.setattr(actions, "generate_paypal_link", slow_link)
+        monkeypatch.setattr(warranty_orchestrator, "LLM_TURN_BUDGET_SECONDS", 0.1)
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, _ = _fake_client([
+            (None, [_FakeToolCall("call_1", "generate_paypal_link", '{"amount": 150.0}')])
+        ])
+        case = CaseContext(
+            product_id="HEAT-001", product_name="Heat Pump", product_type="HEAT", location={"zip": "77001"},
+            logged_in=True, has_registered_products=True, warranty_status={"active": True},
+            potential_charges=150.0, territory_checked=True, territory_serviceable=True
+        )
+
+        result = await asyncio.wait_for(orchestrator.process_with_llm(case, "Yes, go ahead"), timeout=2)
+        await asyncio.sleep(0.5)  # let the abandoned executor thread finish
+
+        assert len(links) == 1
+        assert result["response"] == warranty_orchestrator.STILL_WORKING_RESPONSE
+
+
+class TestCalculationTimeout:
+    """Tests for bounding run_calculation's wall-clock time."""
+
+    @pytest.mark.asyncio
+    async def test_runaway_calculation_does_not_hold_tool_workers(self, monkeypatch):
+        """Test that a snippet that never finishes times out and leaves other tools running."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        monkeypatch.setenv("TOOL_EXECUTOR_WORKERS", "1")
+        monkeypatch.setattr(warranty_orchestrator, "CALCULATION_TIMEOUT_SECONDS", 0.5)
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(location={"zip": "77001"})
+
+        try:
+            result = await orchestrator._execute_tool("run_calculation", {"code": "while True: pass"}, case)
+            assert result["error_code"] == "CALCULATION_TIMEOUT"
+
+            territory = await orchestrator._execute_tool("check_territory", {"location": {"zip": "77001"}}, case)
+            assert territory["status"] == "ok"
+
+            monkeypatch.setattr(warranty_orchestrator, "CALCULATION_TIMEOUT_SECONDS", 30)
+            after = await orchestrator._execute_tool("run_calculation", {"code": "print(6 * 7)"}, case)
+            assert after["data"]["output"] == "42"
+        finally:
+            orchestrator._calculations.close()
+
+
+class TestRetryAfter:
+    """Tests for honouring Retry-After when retrying LLM calls."""
+
+    def test_wait_uses_header_when_longer_than_backoff(self):
+        """Test that Retry-After extends the backoff, capped, and bad values are ignored."""
+        from types import SimpleNamespace
+        from src.orchestrator.warranty_orchestrator import MAX_RETRY_AFTER_SECONDS, _wait_retry_after
+
+        wait = _wait_retry_after(lambda state: 2.0)
+
+        def state(headers):
+            error = SimpleNamespace(response=SimpleNamespace(headers=headers))
+            return SimpleNamespace(outcome=SimpleNamespace(exception=lambda: error))
+
+        assert wait(state({"retry-after": "7"})) == 7.0
+        assert wait(state({"retry-after": "1"})) == 2.0
+        assert wait(state({"retry-after": "3600"})) == MAX_RETRY_AFTER_SECONDS
+        assert wait(state({"retry-after": "soon"})) == 2.0
+        assert wait(state({})) == 2.0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_past_the_deadline_gives_up(self):
+        """Test that a Retry-After longer than the turn's remaining time is not waited out."""
+        import asyncio
+        import time
+        from openai import RateLimitError
+        from types import SimpleNamespace
+        from src.orchestrator import WarrantyOrchestrator
+
+        attempts = []
+
+        async def create(**kwargs):
+            attempts.append(kwargs)
+            response = SimpleNamespace(status_code=429, headers={"retry-after": "30"}, request=None)
+            raise RateLimitError("rate limited", response=response, body=None)
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        deadline = asyncio.get_running_loop().time() + 5
+
+        started = time.monotonic()
+        with pytest.raises(RateLimitError):
+            await orchestrator._complete(deadline=deadline, model="gpt-4o", messages=[])
+
+        assert len(attempts) == 1
+        assert time.monotonic() - started < 1
+
+
+class TestDeterministicPlans:
+    """Tests for answering scripted plans without the LLM."""
+
+    @pytest.mark.asyncio
+    async def test_missing_info_question_skips_model_call(self):
+        """Test that a context-only turn still missing details is answered directly."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([])
+        deltas = []
+
+        async def on_delta(text):
+            deltas.append(text)
+
+        case = CaseContext(product_id="HEAT-001", location={"zip": "77001"})
+        result = await orchestrator.process_with_llm(case, "", on_delta=on_delta)
+
+        assert completions.requests == []
+        assert result["action"] == "ASK_USER"
+        assert "product name" in result["response"]
+        assert deltas == [result["response"]]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("case_fields", [
+        {"product_id": "HEAT-001", "location": {"zip": "77001"}},
+        {
+            "product_id": "HEAT-001", "product_name": "Heat Pump", "product_type": "HEAT",
+            "location": {"zip": "77001"}, "warranty_status": {"active": True}, "potential_charges": 150.0
+        },
+    ], ids=["missing_info", "proceed_confirmation"])
+    async def test_off_topic_question_goes_to_model(self, case_fields):
+        """Test that a question asked instead of the requested answer is not met with the same question."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client, completions = _fake_client([("It covers parts and labour.", None)])
+
+        result = await orchestrator.process_with_llm(CaseContext(**case_fields), "What does the deductible cover?")
+
+        assert len(completions.requests) == 1
+        assert result["response"].strip() == "It covers parts and labour."
+
+
+class TestSpeculativeTools:
+    """Tests for running the likely next read-only tool ahead of time."""
+
+    @pytest.mark.asyncio
+    async def test_territory_check_prefetched_during_proceed_question(self):
+        """Test that a confirmed HEAT case reuses the speculative territory check."""
+        from src.models import CaseContext
+        from src.orchestrator import WarrantyOrchestrator
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(
+            logged_in=True,
+            has_registered_products=True,
+            product_id="HEAT-001",
+            product_name="Heat Pump",
+            product_type="HEAT",
+            location={"zip": "77001", "state": "TX"},
+            warranty_status={"active": True, "coverage_types": ["parts"]}
+        )
+
+        def plan_for(message):
+            return generate_plan(case.to_dict(), message)["data"]
+
+        first = await orchestrator._execute_plan(plan_for("My heater is broken"), case, "My heater is broken")
+        assert first["action"] == "ASK_USER"
+        assert len(orchestrator._speculative) == 1
+
+        await orchestrator._execute_plan(plan_for("Yes, proceed"), case, "Yes, proceed")
+
+        assert len(orchestrator._speculative) == 0
+        assert case.territory_checked is True
+
+    @pytest.mark.asyncio
+    async def test_stale_speculative_result_is_not_used(self, monkeypatch):
+        """Test that a speculative result older than the tool cache TTL is dropped and re-run."""
+        from src.models import CaseContext
+        from src.mcp_servers import warranty_docs
+        from src.orchestrator import WarrantyOrchestrator, warranty_orchestrator
+
+        lookup = warranty_docs.get_warranty_record
+        calls = []
+        monkeypatch.setattr(warranty_docs, "get_warranty_record", lambda **kw: calls.append(kw) or lookup(**kw))
+        monkeypatch.setattr(warranty_orchestrator, "TOOL_CACHE_TTL_SECONDS", 0)
+
+        orchestrator = WarrantyOrchestrator()
+        case = CaseContext(product_id="HEAT-001")
+        orchestrator._speculate(case, "get_warranty_record", {})
+        _, task = next(iter(orchestrator._speculative.values()))
+        await task
+
+        result = await orchestrator._execute_tool("get_warranty_record", {}, case)
+
+        assert result["status"] == "ok"
+        assert len(calls) == 2
+        assert len(orchestrator._speculative) == 0
+
+
+class TestToolCoalescing:
+    """Tests for sharing identical in-flight read-only tool calls across cases."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_record_lookups_share_one_call(self, monkeypatch):
+        """Test that cases looking up the same product make one MCP call."""
+        import asyncio
+        import time
+        from src.models import CaseContext
+        from src.mcp_servers import warranty_docs
+        from src.orchestrator import WarrantyOrchestrator
+
+        lookup = warranty_docs.get_warranty_record
+        calls = []
+
+        def slow_lookup(**kwargs):
+            calls.append(kwargs)
+            time.sleep(0.05)
+            return lookup(**kwargs)
+
+        monkeypatch.setattr(warranty_docs, "get_warranty_record", slow_lookup)
+        orchestrator = WarrantyOrchestrator()
+        cases = [CaseContext(product_id="HEAT-001") for _ in range(3)]
+
+        results = await asyncio.gather(*(
+            orchestrator._execute_tool("get_warranty_record", {}, case) for case in cases
+        ))
+
+        assert len(calls) == 1
+        assert all(r["status"] == "ok" for r in results)
+
+
+class _FakeBatchFiles:
+    """Answers every uploaded line except the last, which the batch drops."""
+
+    def __init__(self):
+        self.lines = []
+
+    async def create(self, file, purpose):
+        import json
+        self.lines = [json.loads(line) for line in file[1].decode().splitlines()]
+        return _ns(id="file-in")
+
+    async def content(self, file_id):
+        import json
+        return _ns(text="\n".join(json.dumps({
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"role": "assistant", "content": f"Answer for {line['custom_id']}"}}]
+            }}
+        }) for line in self.lines[:-1]))
+
+
+class _FakeBatches:
+    def __init__(self):
+        self.retrieved = 0
+
+    async def create(self, input_file_id, endpoint, completion_window):
+        return _ns(id="batch-1", status="validating")
+
+    async def retrieve(self, batch_id):
+        self.retrieved += 1
+        return _ns(id=batch_id, status="completed", output_file_id="file-out", error_file_id=None)
+
+
+class TestBatchProcessing:
+    """Tests for submitting offline requests through the Batch API."""
+
+    @pytest.mark.asyncio
+    async def test_results_map_back_by_case_id(self):
+        """Test that each request becomes one JSONL line and gets its own result."""
+        from src.orchestrator import WarrantyOrchestrator
+
+        files, batches = _FakeBatchFiles(), _FakeBatches()
+        orchestrator = WarrantyOrchestrator()
+        orchestrator.client = _ns(files=files, batches=batches)
+
+        results = await orchestrator.batch_process([
+            {"messages": [{"role": "user", "content": message}],
+             "context": {"product_id": "HEAT-001", "warranty_status": {}}}
+            for message in ("Am I covered?", "Is my area serviced?", "Hello")
+        ], poll_interval=0)
+
+        case_ids = [line["custom_id"] for line in files.lines]
+        assert len(set(case_ids)) == 3
+        assert files.lines[0]["url"] == "/chat/completions"
+        assert batches.retrieved == 1
+        assert results[case_ids[0]]["response"] == f"Answer for {case_ids[0]}"
+        assert results[case_ids[1]]["status"] == "ok"
+        assert results[case_ids[2]]["status"] == "error"
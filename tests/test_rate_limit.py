@@ -0,0 +1,52 @@
+"""
+Unit Tests for Rate Limiting
+
+Tests the tokens-per-minute budget for LLM calls.
+"""
+
+import pytest
+from types import SimpleNamespace
+from src.orchestrator import rate_limit
+from src.orchestrator.rate_limit import TokenBudget
+
+
+class TestTokenBudget:
+    """Tests for the tokens-per-minute budget."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_budget_never_waits(self):
+        """Test that a zero budget records nothing and does not block."""
+        budget = TokenBudget(tokens_per_minute=0)
+        budget.record(10_000)
+
+        await budget.wait()
+        assert budget.used == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_until_usage_leaves_window(self, monkeypatch):
+        """Test that an exhausted budget waits for old usage to expire."""
+        clock = [100.0]
+        sleeps = []
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+            clock[0] += delay
+
+        monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+        monkeypatch.setattr(rate_limit, "asyncio", SimpleNamespace(sleep=fake_sleep))
+
+        budget = TokenBudget(tokens_per_minute=1000)
+        budget.record(600)
+        await budget.wait()
+        assert sleeps == []
+
+        clock[0] += 15
+        budget.record(600)
+        await budget.wait()
+
+        assert sleeps == [45.0]
+        assert budget.used == 600
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])